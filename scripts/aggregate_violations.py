@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Validates one or more or a directory of RDF files against SHACL shapes and
+folds the validation results into counters keyed by shape, constraint
+component, path and publisher. Partial aggregates from other runs can be
+merged in, and the summary is exported to CSV and/or JSON. Keys are always
+full IRIs; prefixes are only applied to the printed report and the CSV.
+"""
+
+import argparse
+import csv
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+from rdflib import RDF, BNode, Graph
+from rdflib.namespace import DCTERMS, FOAF, SH
+
+from extract_entity_usage import parse_file, to_prefixed
+from shacl_index import load_index, namespace_graph, validate_dispatched
+from validation_runner import DEFAULT_SHAPES_FILE
+
+AGGREGATE_FIELDS = ["shape", "component", "path", "publisher", "count"]
+
+# How many incoming links to follow when looking for a dcterms:publisher, e.g.
+# Distribution <- Dataset <- Catalog
+MAX_PUBLISHER_DEPTH = 3
+
+# Key values that are IRIs, as opposed to the names of anonymous publishers
+IRI_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:[^\s<>\"]+$")
+
+
+def format_term(term):
+    """Render an RDF term as a string key"""
+    return "" if term is None else str(term)
+
+
+def find_publisher(data_graph, node, max_depth=MAX_PUBLISHER_DEPTH):
+    """
+    Find the dcterms:publisher of a focus node. If the node has none, walk up
+    the resources that link to it (breadth first) until one is found. A node
+    shared by several publishers at the same depth (e.g. a licence used by
+    two datasets) gets the first of them in sorted order, so the result does
+    not depend on the order of the triples.
+    """
+    frontier = [node]
+    seen = {node}
+    for _ in range(max_depth + 1):
+        publishers = {
+            publisher
+            for current in frontier
+            for publisher in data_graph.objects(current, DCTERMS.publisher)
+        }
+        if publishers:
+            return min(
+                publishers,
+                key=lambda publisher: format_publisher(data_graph, publisher),
+            )
+        next_frontier = []
+        for current in frontier:
+            for subject in data_graph.subjects(None, current):
+                if subject not in seen:
+                    seen.add(subject)
+                    next_frontier.append(subject)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return None
+
+
+def format_publisher(data_graph, publisher):
+    """
+    Blank node identifiers change between parses, so anonymous publishers are
+    keyed by their foaf:name instead.
+    """
+    if isinstance(publisher, BNode):
+        name = data_graph.value(publisher, FOAF.name)
+        return str(name) if name is not None else "_:anonymous"
+    return format_term(publisher)
+
+
+def iter_validation_results(report_graph):
+    """Yield (shape, component, path, focus node) for each sh:ValidationResult"""
+    for result in report_graph.subjects(RDF.type, SH.ValidationResult):
+        yield (
+            report_graph.value(result, SH.sourceShape),
+            report_graph.value(result, SH.sourceConstraintComponent),
+            report_graph.value(result, SH.resultPath),
+            report_graph.value(result, SH.focusNode),
+        )
+
+
+def aggregate_report(report_graph, data_graph, counts=None):
+    """
+    Fold the results of a validation report into counts. Only the distinct
+    (shape, component, path, publisher) keys are kept, never the results.
+    """
+    if counts is None:
+        counts = Counter()
+    for shape, component, path, focus in iter_validation_results(report_graph):
+        publisher = find_publisher(data_graph, focus) if focus is not None else None
+        key = (
+            format_term(shape),
+            format_term(component),
+            format_term(path),
+            format_publisher(data_graph, publisher),
+        )
+        counts[key] += 1
+    return counts
+
+
+def iter_data_files(paths):
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            yield path
+        elif path.is_dir():
+            for file in sorted(path.rglob("*")):
+                if file.is_file():
+                    yield file
+        else:
+            raise ValueError(f"Invalid path: {path} must be a file or directory")
+
+
+def aggregate_files(paths, shacl_graph, index, counts=None):
+    """
+    Validate each file separately, with the shapes dispatched by the index,
+    and fold its report into counts
+    """
+    if counts is None:
+        counts = Counter()
+    for file in iter_data_files(paths):
+        try:
+            data_graph = parse_file(Graph(), file)
+        except Exception as e:
+            print(f"⚠️ Failed to parse {file}: {e}")
+            continue
+        _, report_graph, _ = validate_dispatched(data_graph, shacl_graph, index)
+        aggregate_report(report_graph, data_graph, counts)
+    return counts
+
+
+def prefixed_counts(counts, graph):
+    """
+    Counts with the IRIs of each key shortened to qnames of graph. One graph
+    names all keys, so the same prefix always stands for the same namespace.
+    """
+    def name(value):
+        if value and not value.startswith("_:") and IRI_PATTERN.match(value):
+            return to_prefixed(graph, value)
+        return value
+
+    prefixed = Counter()
+    for key, count in counts.items():
+        prefixed[tuple(name(value) for value in key)] += count
+    return prefixed
+
+
+def merge_aggregates(*aggregates):
+    merged = Counter()
+    for counts in aggregates:
+        merged.update(counts)
+    return merged
+
+
+def aggregate_rows(counts):
+    """Rows sorted by descending count, then by key, for a deterministic output"""
+    for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+        yield dict(zip(AGGREGATE_FIELDS, (*key, count)))
+
+
+def load_aggregate_json(input_file):
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    counts = Counter()
+    for row in data["violations"]:
+        key = tuple(row[field] or "" for field in AGGREGATE_FIELDS[:-1])
+        counts[key] += int(row["count"])
+    return counts
+
+
+def print_report(counts):
+    for row in aggregate_rows(counts):
+        print(
+            f"  ❌ {row['count']:>6} {row['shape']} {row['path']} "
+            f"[{row['component']}] {row['publisher'] or '-'}"
+        )
+    print("\n📦 Violation summary")
+    print(f"Distinct keys: {len(counts)}")
+    print(f"Total violations: {sum(counts.values())}")
+
+
+def export_to_csv(counts, output_file):
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=AGGREGATE_FIELDS)
+        writer.writeheader()
+        for row in aggregate_rows(counts):
+            writer.writerow(row)
+    print(f"✅ CSV saved to {output_file}")
+
+
+def export_to_json(counts, output_file):
+    data = {
+        "total": sum(counts.values()),
+        "violations": list(aggregate_rows(counts)),
+    }
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"✅ JSON saved to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Aggregate SHACL validation results by shape, path and publisher"
+    )
+    parser.add_argument(
+        "input", nargs="*", help="Paths to RDF files or folders to validate"
+    )
+    parser.add_argument(
+        "-s",
+        "--shapes",
+        default=DEFAULT_SHAPES_FILE,
+        help="Path to the SHACL shapes file",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        default=[],
+        help="JSON aggregates from other runs or workers to merge in",
+    )
+    parser.add_argument(
+        "--prefixed",
+        action="store_true",
+        help="Use prefixed URIs in the report and the CSV (the JSON keeps full IRIs)",
+    )
+    parser.add_argument("--csv", help="Export the summary to CSV file")
+    parser.add_argument("--json", help="Export the summary to JSON file, for --merge")
+    args = parser.parse_args()
+
+    if not args.input and not args.merge:
+        parser.error("nothing to aggregate: give input paths and/or --merge files")
+
+    counts = merge_aggregates(*(load_aggregate_json(f) for f in args.merge))
+    index = None
+    if args.input:
+        shacl_graph = Graph().parse(args.shapes)
+        index = load_index(args.shapes, shacl_graph)
+        aggregate_files(args.input, shacl_graph, index, counts)
+
+    shown = counts
+    if args.prefixed:
+        # The prefixes of the shapes, not of each data file, so that a
+        # prefix means the same namespace in every run
+        shown = prefixed_counts(counts, namespace_graph(index or load_index(args.shapes)))
+
+    print_report(shown)
+
+    if args.csv:
+        export_to_csv(shown, args.csv)
+    if args.json:
+        export_to_json(counts, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Checks that the RDF/XML and Turtle copies of the model2owl artefacts (OWL
+ontologies and SHACL shapes) describe the same graph, by comparing the
+hashes of their canonical N-Triples. Each artefact can also be exported as
+sorted canonical N-Triples and as a compact binary file, with a manifest
+of their hashes, so consumers can load them with a fast parser and verify
+them at startup without canonicalising again.
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.compare import to_canonical_graph
+
+ARTEFACT_DIR = "implementation/dcat_ap_lu"
+ARTEFACT_FORMATS = {".rdf": "xml", ".ttl": "turtle"}
+MANIFEST_FILE = "manifest.json"
+
+BINARY_SUFFIX = ".rdfc"
+BINARY_MAGIC = b"RDFC\x01"
+IRI, BLANK, LITERAL = 0, 1, 2
+
+
+def find_artefacts(root):
+    """Artefact name -> its RDF/XML and Turtle files, e.g. owl_ontology/x"""
+    artefacts = {}
+    for file in sorted(Path(root).rglob("*")):
+        if file.is_file() and file.suffix in ARTEFACT_FORMATS:
+            name = file.relative_to(root).with_suffix("").as_posix()
+            artefacts.setdefault(name, []).append(file)
+    return artefacts
+
+
+def canonical_graph(graph):
+    """The graph with blank nodes relabelled from their surroundings"""
+    if any(isinstance(term, BNode) for triple in graph for term in triple):
+        return to_canonical_graph(graph)
+    return graph
+
+
+def canonical_ntriples(graph):
+    """
+    Sorted N-Triples lines of the canonical graph, identical for isomorphic
+    graphs
+    """
+    graph = canonical_graph(graph)
+    lines = graph.serialize(format="nt", encoding="utf-8").splitlines()
+    return sorted(line for line in lines if line.strip())
+
+
+def ntriples_bytes(lines):
+    return b"".join(line + b"\n" for line in lines)
+
+
+def canonical_hash(graph):
+    """SHA-256 of the canonical N-Triples, equal for isomorphic graphs"""
+    return hashlib.sha256(ntriples_bytes(canonical_ntriples(graph))).hexdigest()
+
+
+def check_artefacts(artefacts):
+    """Parse every copy of each artefact and compare their canonical hashes"""
+    results = {}
+    for name, files in artefacts.items():
+        hashes = {}
+        for file in files:
+            graph = Graph().parse(file, format=ARTEFACT_FORMATS[file.suffix])
+            hashes[file.name] = canonical_hash(graph)
+        results[name] = {
+            "hashes": hashes,
+            "consistent": len(set(hashes.values())) == 1,
+        }
+    return results
+
+
+def print_report(results):
+    for name, result in results.items():
+        if len(result["hashes"]) < 2:
+            print(f"⚠️ {name}: only {', '.join(result['hashes'])}, nothing to compare")
+        elif result["consistent"]:
+            digest = next(iter(result["hashes"].values()))
+            print(f"✅ {name}: {', '.join(result['hashes'])} are isomorphic ({digest[:12]})")
+        else:
+            print(f"❌ {name}: copies differ")
+            for file_name, digest in result["hashes"].items():
+                print(f"  {file_name}: {digest}")
+
+
+def _pack_string(value):
+    data = value.encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+def _unpack_string(data, offset):
+    (length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    return data[offset : offset + length].decode("utf-8"), offset + length
+
+
+def encode_binary(graph, digest):
+    """
+    Compact form of a graph: a table of distinct terms and the triples as
+    little-endian uint32 term ids, zlib-compressed. The header carries the
+    canonical hash, so a consumer can check it against the manifest
+    before decoding.
+    """
+    ids = {}
+    terms = []
+    triples = array("I")
+    for triple in sorted(graph):
+        for term in triple:
+            if term not in ids:
+                ids[term] = len(terms)
+                terms.append(term)
+            triples.append(ids[term])
+    if sys.byteorder != "little":
+        triples.byteswap()
+
+    body = [struct.pack("<II", len(terms), len(triples) // 3)]
+    for term in terms:
+        if isinstance(term, Literal):
+            body.append(bytes([LITERAL]))
+            body.append(_pack_string(str(term)))
+            body.append(_pack_string(term.language or ""))
+            body.append(_pack_string(str(term.datatype or "")))
+        else:
+            body.append(bytes([BLANK if isinstance(term, BNode) else IRI]))
+            body.append(_pack_string(str(term)))
+    body.append(triples.tobytes())
+    return BINARY_MAGIC + bytes.fromhex(digest) + zlib.compress(b"".join(body), 9)
+
+
+def binary_hash(data):
+    """The canonical hash stored in the header of a binary file"""
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError("Not a compact RDF file")
+    return data[len(BINARY_MAGIC) : len(BINARY_MAGIC) + 32].hex()
+
+
+def decode_binary(data, graph=None):
+    """Load the triples of a compact RDF file into a graph"""
+    binary_hash(data)
+    decompressor = zlib.decompressobj()
+    body = decompressor.decompress(data[len(BINARY_MAGIC) + 32 :])
+    if not decompressor.eof or decompressor.unused_data:
+        raise ValueError("Truncated or trailing data in compact RDF file")
+    term_count, triple_count = struct.unpack_from("<II", body, 0)
+    offset = 8
+    terms = []
+    for _ in range(term_count):
+        kind = body[offset]
+        value, offset = _unpack_string(body, offset + 1)
+        if kind == LITERAL:
+            language, offset = _unpack_string(body, offset)
+            datatype, offset = _unpack_string(body, offset)
+            terms.append(
+                Literal(
+                    value,
+                    lang=language or None,
+                    datatype=URIRef(datatype) if datatype else None,
+                )
+            )
+        else:
+            terms.append(BNode(value) if kind == BLANK else URIRef(value))
+
+    triples = array("I")
+    triples.frombytes(body[offset : offset + triple_count * 3 * triples.itemsize])
+    if sys.byteorder != "little":
+        triples.byteswap()
+
+    graph = Graph() if graph is None else graph
+    for i in range(0, len(triples), 3):
+        graph.add((terms[triples[i]], terms[triples[i + 1]], terms[triples[i + 2]]))
+    return graph
+
+
+def load_binary(file_path, expected_hash=None):
+    """
+    Load a compact RDF file, optionally checking its canonical hash (e.g.
+    from the manifest) first. A corrupted body fails the zlib checksum or length checks.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    if expected_hash is not None and binary_hash(data) != expected_hash:
+        raise ValueError(f"{file_path} does not match the expected hash")
+    return decode_binary(data)
+
+
+def export_artefacts(artefacts, output_dir):
+    """
+    Write <name>.nt (canonical N-Triples) and <name>.rdfc (compact binary)
+    for each artefact, from its Turtle copy, and a manifest of their hashes
+    """
+    output_dir = Path(output_dir)
+    manifest = {}
+    for name, files in artefacts.items():
+        source = next((f for f in files if f.suffix == ".ttl"), files[0])
+        graph = Graph().parse(source, format=ARTEFACT_FORMATS[source.suffix])
+        # The binary copy holds the canonical graph too, so its blank node
+        # labels match the N-Triples and both files are reproducible
+        canonical = canonical_graph(graph)
+        lines = canonical_ntriples(canonical)
+        ntriples = ntriples_bytes(lines)
+        digest = hashlib.sha256(ntriples).hexdigest()
+        nt_file = output_dir / f"{name}.nt"
+        binary_file = output_dir / f"{name}{BINARY_SUFFIX}"
+        nt_file.parent.mkdir(parents=True, exist_ok=True)
+        nt_file.write_bytes(ntriples)
+        binary_file.write_bytes(encode_binary(canonical, digest))
+
+        manifest[name] = {
+            "sources": [file.name for file in files],
+            "sha256": digest,
+            "triples": len(lines),
+            "ntriples": nt_file.relative_to(output_dir).as_posix(),
+            "binary": binary_file.relative_to(output_dir).as_posix(),
+        }
+        print(f"📦 {name}: {len(lines)} triples")
+
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"✅ Exported {len(manifest)} artefacts to {output_dir}")
+    return manifest
+
+
+def verify_export(output_dir, results=None):
+    """
+    Check the exported files against the manifest: the N-Triples by their
+    SHA-256, the binary copies by their header and their triple count. With
+    the results of check_artefacts, also check that the export is up to date.
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    valid = True
+    for name in sorted(set(results or {}) - set(manifest)):
+        print(f"❌ {name} is not exported")
+        valid = False
+    for name, entry in manifest.items():
+        if results is not None:
+            hashes = set(results.get(name, {}).get("hashes", {}).values())
+            if hashes != {entry["sha256"]}:
+                print(f"❌ {name}: export is out of date with the artefacts")
+                valid = False
+        nt_file = output_dir / entry["ntriples"]
+        if hashlib.sha256(nt_file.read_bytes()).hexdigest() != entry["sha256"]:
+            print(f"❌ {nt_file} does not match the manifest")
+            valid = False
+        try:
+            graph = load_binary(output_dir / entry["binary"], entry["sha256"])
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"❌ {name}: {e}")
+            valid = False
+            continue
+        if len(graph) != entry["triples"]:
+            print(f"❌ {output_dir / entry['binary']} has {len(graph)} triples")
+            valid = False
+    if valid:
+        print(f"✅ {len(manifest)} exported artefacts match {output_dir / MANIFEST_FILE}")
+    return valid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the RDF/XML and Turtle artefacts are isomorphic "
+        "and export them as canonical N-Triples and compact binary files"
+    )
+    parser.add_argument(
+        "root",
+        nargs="?",
+        default=ARTEFACT_DIR,
+        help="Folder with the .rdf and .ttl artefacts",
+    )
+    parser.add_argument(
+        "-o", "--output", help="Export the artefacts to this folder"
+    )
+    parser.add_argument(
+        "--verify",
+        help="Also check a folder exported with --output against its manifest "
+        "and the artefacts",
+    )
+    parser.add_argument("--json", help="Export the hashes of the check to JSON file")
+    args = parser.parse_args()
+
+    artefacts = find_artefacts(args.root)
+    results = check_artefacts(artefacts)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ JSON saved to {args.json}")
+
+    if not all(result["consistent"] for result in results.values()):
+        sys.exit(1)
+    if args.verify and not verify_export(args.verify, results):
+        sys.exit(1)
+    if args.output:
+        export_artefacts(artefacts, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 #!/usr/bin/env python3
 """
 Compares SHACL-defined entities against RDF-used entities. Calculates usage
-coverage and exports results. Supports filtering with a lookup table.
+coverage and exports results. Supports filtering with a lookup table. Stage
+timings, counters and peak RSS can be exported with --metrics.
 """
 
 import argparse
 import json
 import csv
 
+from pipeline_metrics import metrics
+
 
 def load_list(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         return sorted(set(line.strip() for line in f if line.strip()))
 
 
+def entity_lines(classes, properties):
+    """Same one-entity-per-line form as extract_entity_usage.py prints"""
+    lines = list(classes)
+    for prop, parent in properties:
+        lines.append(f"{parent} {prop}" if parent else f"- {prop}")
+    return sorted(set(lines))
+
+
 def compare_lists(shacl_list, rdf_list):
     used = [item for item in shacl_list if item in rdf_list]
     unused = [item for item in shacl_list if item not in rdf_list]
@@ -74,18 +85,37 @@ def main():
     )
     parser.add_argument("--csv", help="Export results to CSV file")
     parser.add_argument("--json", help="Export results to JSON file")
+    parser.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        help="Export stage timings, counters and peak RSS (.json for JSON, "
+        "anything else for OpenMetrics text); can be given more than once",
+    )
     args = parser.parse_args()
+    metrics.reset("check_entity_coverage")
+
+    with metrics.span("total"):
+        with metrics.span("load"):
+            shacl_list = load_list(args.shacl_file)
+            rdf_list = load_list(args.rdf_file)
+
+        with metrics.span("compare"):
+            results = compare_lists(shacl_list, rdf_list)
+        metrics.count("defined", len(results["defined"]))
+        metrics.count("used", len(results["used"]))
+        metrics.count("unused", len(results["unused"]))
 
-    shacl_list = load_list(args.shacl_file)
-    rdf_list = load_list(args.rdf_file)
+        with metrics.span("export"):
+            print_report(results, args.label)
 
-    results = compare_lists(shacl_list, rdf_list)
-    print_report(results, args.label)
+            if args.csv:
+                export_to_csv(results, args.csv, args.label)
+            if args.json:
+                export_to_json(results, args.json, args.label)
 
-    if args.csv:
-        export_to_csv(results, args.csv, args.label)
-    if args.json:
-        export_to_json(results, args.json, args.label)
+    for metrics_file in args.metrics:
+        metrics.export(metrics_file)
 
 
 if __name__ == "__main__":
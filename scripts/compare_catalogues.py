@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Compares the entity coverage of many catalogues in one run. The SHACL side
+of the MUST/SHOULD/COULD coverage (the baseline) is computed once from the
+shapes index and the UML lookup table; the catalogues are then read in
+parallel and summarised as a publisher x entity usage matrix.
+"""
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from check_entity_coverage import compare_lists, entity_lines
+from extract_entity_usage import (
+    get_all_classes,
+    get_all_properties,
+    load_filter_entities,
+    load_graph_from_path,
+    load_usage_from_path,
+    scan_usage,
+    scannable_files,
+)
+from pipeline_metrics import metrics
+from shacl_index import index_entities, load_index
+from validation_runner import DEFAULT_SHAPES_FILE
+
+UML_ENTITIES_FILE = "reports/uml_entities.csv"
+
+# MoSCoW label of each qualifier of the UML lookup table
+QUALIFIERS = {"MUST": "mandatory", "SHOULD": "recommended", "COULD": "optional"}
+
+
+def shacl_baseline(shapes_file, uml_file, qualifiers=QUALIFIERS):
+    """Prefixed SHACL entity lines for each MoSCoW label, computed once"""
+    index = load_index(shapes_file)
+    baseline = {}
+    for label, qualifier in qualifiers.items():
+        filter_entities, property_parents = load_filter_entities(
+            uml_file, "qualifier", qualifier
+        )
+        baseline[label] = entity_lines(
+            *index_entities(
+                index,
+                use_prefixes=True,
+                filter_entities=filter_entities,
+                property_parents=property_parents,
+            )
+        )
+    return baseline
+
+
+def catalogue_entities(path, cache_dir=None):
+    """
+    All prefixed entity lines a catalogue uses. Filtering the data by a
+    qualifier and then comparing it to the filtered SHACL lines is the same
+    as intersecting these with the baseline, so the data is read only once.
+    """
+    files = None if cache_dir else scannable_files(path)
+    if files:
+        usage = scan_usage(files, use_prefixes=True)
+        return entity_lines(usage["classes"], usage["properties"])
+    if cache_dir:
+        usage = load_usage_from_path(path, cache_dir, use_prefixes=True)
+        return entity_lines(usage["classes"], usage["properties"])
+    graph = load_graph_from_path(path)
+    return entity_lines(
+        get_all_classes(graph, use_prefixes=True),
+        get_all_properties(graph, use_prefixes=True),
+    )
+
+
+def _evaluate(task):
+    name, path, cache_dir = task
+    try:
+        return name, set(catalogue_entities(path, cache_dir)), None
+    except Exception as e:
+        return name, set(), str(e)
+
+
+def catalogue_names(paths):
+    """
+    Column labels: the folder name (e.g. the host folders of
+    harvest_catalogues.py) or file name without suffix, made unique if needed
+    """
+    names = []
+    for path in paths:
+        path = Path(path)
+        name = (path.name if path.is_dir() else path.stem) or str(path)
+        candidate, suffix = name, 2
+        while candidate in names:
+            candidate = f"{name}-{suffix}"
+            suffix += 1
+        names.append(candidate)
+    return names
+
+
+def compare_catalogues(paths, baseline, processes=1, cache_dir=None):
+    """
+    Evaluate each catalogue against the baseline. Returns one row per
+    catalogue, in input order, with the used entities and the coverage of
+    each MoSCoW label.
+    """
+    tasks = [
+        (name, str(path), cache_dir)
+        for name, path in zip(catalogue_names(paths), paths)
+    ]
+    if processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_evaluate, tasks, chunksize=4))
+    else:
+        results = [_evaluate(task) for task in tasks]
+
+    rows = []
+    for name, used, error in results:
+        metrics.count("catalogues")
+        if error:
+            metrics.count("failed_catalogues")
+            print(f"⚠️ Failed to read {name}: {error}")
+        row = {"publisher": name, "error": error, "used": {}, "coverage": {}}
+        for label, lines in baseline.items():
+            comparison = compare_lists(lines, used)
+            row["used"][label] = set(comparison["used"])
+            row["coverage"][label] = comparison["coverage_percent"]
+        rows.append(row)
+    return rows
+
+
+def matrix_columns(baseline):
+    return [(label, line) for label, lines in baseline.items() for line in lines]
+
+
+def print_report(rows, baseline):
+    labels = list(baseline)
+    print("\n📦 Coverage by publisher")
+    print("  ".join(["Publisher".ljust(32)] + [label.rjust(7) for label in labels]))
+    for row in rows:
+        print(
+            "  ".join(
+                [row["publisher"][:32].ljust(32)]
+                + [f"{row['coverage'][label]:6.2f}%" for label in labels]
+            )
+        )
+    for label in labels:
+        unused = [
+            line
+            for line in baseline[label]
+            if not any(line in row["used"][label] for row in rows)
+        ]
+        print(
+            f"\n{label}: {len(unused)} of {len(baseline[label])} entities "
+            "used by no publisher"
+        )
+        for line in unused:
+            print(f"  ❌ {line}")
+
+
+def export_to_csv(rows, baseline, output_file):
+    """
+    One row per publisher, with its coverage per MoSCoW label and one 0/1
+    column per baseline entity (named "<label> <entity>")
+    """
+    columns = matrix_columns(baseline)
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["publisher"]
+            + [f"{label} coverage" for label in baseline]
+            + [f"{label} {line}" for label, line in columns]
+        )
+        for row in rows:
+            writer.writerow(
+                [row["publisher"]]
+                + [row["coverage"][label] for label in baseline]
+                + [int(line in row["used"][label]) for label, line in columns]
+            )
+    print(f"✅ CSV saved to {output_file}")
+
+
+def export_to_json(rows, baseline, output_file):
+    data = {
+        "baseline": baseline,
+        "publishers": [
+            {
+                "publisher": row["publisher"],
+                "error": row["error"],
+                "coverage": row["coverage"],
+                "used": {label: sorted(used) for label, used in row["used"].items()},
+            }
+            for row in rows
+        ],
+    }
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"✅ JSON saved to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the SHACL entity coverage of several catalogues"
+    )
+    parser.add_argument(
+        "input", nargs="+", help="Catalogue files or folders, one per publisher"
+    )
+    parser.add_argument(
+        "-s",
+        "--shapes",
+        default=DEFAULT_SHAPES_FILE,
+        help="Path to the SHACL shapes file",
+    )
+    parser.add_argument(
+        "--uml",
+        default=UML_ENTITIES_FILE,
+        help="UML lookup table from extract_uml_entities.py",
+    )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of catalogues read in parallel",
+    )
+    parser.add_argument(
+        "--cache",
+        help="Directory for per-file usage results, as in extract_entity_usage.py",
+    )
+    parser.add_argument("--csv", help="Export the publisher x entity matrix to CSV file")
+    parser.add_argument("--json", help="Export the comparison to JSON file")
+    parser.add_argument(
+        "--metrics",
+        action="append",
+        help="Export stage metrics (.json for JSON, anything else for OpenMetrics)",
+    )
+    args = parser.parse_args()
+
+    metrics.reset("compare_catalogues")
+    with metrics.span("total"):
+        with metrics.span("baseline"):
+            baseline = shacl_baseline(args.shapes, args.uml)
+        with metrics.span("compare"):
+            rows = compare_catalogues(args.input, baseline, args.processes, args.cache)
+        print_report(rows, baseline)
+
+        with metrics.span("export"):
+            if args.csv:
+                export_to_csv(rows, baseline, args.csv)
+            if args.json:
+                export_to_json(rows, baseline, args.json)
+
+    for output_file in args.metrics or []:
+        metrics.export(output_file)
+
+
+if __name__ == "__main__":
+    main()
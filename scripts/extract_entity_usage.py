@@ -1,16 +1,29 @@
 #!/usr/bin/env python3
 """
 Extracts use of classes and properties from one or more or a directory of RDF
-files. Supports data mode (default) and SHACL mode.
+files. Supports data mode (default) and SHACL mode. In data mode, per-file
+usage can be cached by file content so that unchanged files are not parsed
+again on the next run. N-Triples and N-Quads input is scanned line by line
+instead of being loaded into a Graph. In SHACL mode, a shapes file is read
+through its precompiled index (see shacl_index.py). Stage timings, counters
+and peak RSS can be exported with --metrics.
 """
 
 import sys
 import json
 import csv
+import hashlib
+import os
+from collections import Counter, defaultdict
 from pathlib import Path
-from rdflib import RDF, Graph
+from time import perf_counter
+from rdflib import RDF, Dataset, Graph, URIRef
 from rdflib.namespace import SH
 
+from jsonld_ingest import parse_jsonld
+from ntriples_scan import is_scannable, scan_files
+from pipeline_metrics import metrics
+
 
 # TODO: Extend support with an option to take a prefix normalization table from a configuration file
 # This would allow for more flexible prefix normalization across different datasets
@@ -26,33 +39,64 @@ def normalize_prefix(uri):
     return uri
 
 
+def to_prefixed(graph, uri):
+    try:
+        prefix, _, local = graph.compute_qname(uri)
+        return normalize_prefix(f"{prefix}:{local}")
+    except Exception:
+        return uri
+
+
 def guess_format(file_path):
     ext = file_path.suffix.lower()
     return {
         ".ttl": "turtle",
         ".rdf": "xml",
         ".nt": "nt",
+        ".nq": "nquads",
         ".n3": "n3",
         ".jsonld": "json-ld",
     }.get(ext, "xml")
 
 
+def parse_file(graph, file_path):
+    """Parse a single RDF file into graph, streaming JSON-LD with cached contexts"""
+    file_path = Path(file_path)
+    fmt = guess_format(file_path)
+    if fmt == "json-ld":
+        return parse_jsonld(file_path, graph)
+    if fmt == "nquads":
+        # Merge the named graphs, as the line scanner does
+        dataset = Dataset()
+        dataset.parse(file_path, format=fmt)
+        for s, p, o, _ in dataset.quads():
+            graph.add((s, p, o))
+        return graph
+    return graph.parse(file_path, format=fmt)
+
+
 def load_graph_from_path(path):
     graph = Graph()
     path = Path(path)
 
     if path.is_file():
-        graph.parse(path, format=guess_format(path))
+        with metrics.span("parse"):
+            parse_file(graph, path)
+        metrics.count("files")
     elif path.is_dir():
         for file in path.rglob("*"):
             if file.is_file():
+                metrics.count("files")
                 try:
-                    graph.parse(file, format=guess_format(file))
+                    with metrics.span("parse"):
+                        parse_file(graph, file)
                 except Exception as e:
+                    metrics.count("failed_files")
                     print(f"⚠️ Failed to parse {file}: {e}")
     else:
         raise ValueError("Invalid path: must be a file or directory")
 
+    metrics.count("triples", len(graph))
     return graph
 
 
@@ -106,49 +150,46 @@ def get_all_properties(
     # Track combinations we've already seen
     seen_combinations = set()
 
+    # One pass over the rows; the qname and filter work is timed per row so
+    # that the rows never have to be held in memory
+    rows = 0
+    qnames_time = filter_time = 0.0
+    start = perf_counter()
     for row in graph.query(query):
-        uri = str(row["property"])
+        rows += 1
+        qnames_start = perf_counter()
 
-        parent = None
-        if row["type"]:
-            parent = str(row["type"])
-            if use_prefixes:
-                try:
-                    prefix, _, local = graph.compute_qname(parent)
-                    parent = f"{prefix}:{local}"
-                    # Normalize parent prefix
-                    parent = normalize_prefix(parent)
-                except Exception:
-                    pass
-
-        # Format the property URI with prefix if needed
-        prop_uri = uri
+        # Format the property and parent URIs with prefix if needed
+        prop_uri = str(row["property"])
+        parent = str(row["type"]) if row["type"] else None
         if use_prefixes:
-            try:
-                prefix, _, local = graph.compute_qname(uri)
-                prop_uri = f"{prefix}:{local}"
-                # Normalize property prefix
-                prop_uri = normalize_prefix(prop_uri)
-            except Exception:
-                pass
+            prop_uri = to_prefixed(graph, prop_uri)
+            if parent is not None:
+                parent = to_prefixed(graph, parent)
+        combination = (prop_uri, parent)
 
+        filter_start = perf_counter()
+        qnames_time += filter_start - qnames_start
         # Filter entities based on the property name
-        if filter_entities is not None and prop_uri not in filter_entities:
-            continue
+        keep = filter_entities is None or prop_uri in filter_entities
 
         # Filter property-parent combinations if property_parents is provided
-        if property_parents is not None and prop_uri in property_parents:
+        if keep and property_parents is not None and prop_uri in property_parents:
             # Only include this combination if parent matches expected parents
-            if parent not in property_parents[prop_uri]:
-                continue
+            keep = parent in property_parents[prop_uri]
 
         # Add the combination if we haven't seen it before
-        combination = (prop_uri, parent)
-        if combination not in seen_combinations:
+        if keep and combination not in seen_combinations:
             results.append(combination)
             seen_combinations.add(combination)
+        filter_time += perf_counter() - filter_start
 
-    return sorted(results)
+    metrics.record("query", perf_counter() - start - qnames_time - filter_time)
+    metrics.record("qnames", qnames_time)
+    metrics.record("filter", filter_time)
+    metrics.count("query_rows", rows)
+
+    return sorted(results, key=lambda r: (r[0], r[1] or ""))
 
 
 def get_all_classes(graph, use_prefixes=False, filter_entities=None):
@@ -157,26 +198,31 @@ def get_all_classes(graph, use_prefixes=False, filter_entities=None):
       ?instance a ?class .
     }
     """
-    results = []
+    results = set()
+
+    rows = 0
+    qnames_time = filter_time = 0.0
+    start = perf_counter()
     for row in graph.query(query):
-        uri = str(row["class"])
+        rows += 1
+        qnames_start = perf_counter()
+        class_uri = str(row["class"])
         if use_prefixes:
-            try:
-                prefix, _, local = graph.compute_qname(uri)
-                class_uri = f"{prefix}:{local}"
-                # Normalize class prefix
-                class_uri = normalize_prefix(class_uri)
-            except Exception:
-                class_uri = uri
-        else:
-            class_uri = uri
+            class_uri = to_prefixed(graph, class_uri)
 
         # If filter is active, skip non-matching entities
-        if filter_entities is not None and class_uri not in filter_entities:
-            continue
+        filter_start = perf_counter()
+        qnames_time += filter_start - qnames_start
+        if filter_entities is None or class_uri in filter_entities:
+            results.add(class_uri)
+        filter_time += perf_counter() - filter_start
 
-        results.append(class_uri)
-    return sorted(set(results))
+    metrics.record("query", perf_counter() - start - qnames_time - filter_time)
+    metrics.record("qnames", qnames_time)
+    metrics.record("filter", filter_time)
+    metrics.count("query_rows", rows)
+
+    return sorted(results)
 
 
 def get_shacl_classes(graph, use_prefixes=False, filter_entities=None):
@@ -300,7 +346,254 @@ def get_shacl_properties(
                     results.append(combination)
                     seen_combinations.add(combination)
 
-    return sorted(results)
+    return sorted(results, key=lambda r: (r[0], r[1] or ""))
+
+
+# Bump when the content of cached usage tables changes
+USAGE_CACHE_VERSION = 2
+
+
+def file_usage(file_path):
+    """
+    Map step: the usage of one file, with full URIs, along with the
+    prefixes the file declares. The types and predicates of IRI subjects
+    are kept per subject, so that reduce_usage can join a subject typed in
+    one file to its properties in another, as a graph of all files would.
+    Blank nodes are local to their file, so their usage is counted here.
+    """
+    with metrics.span("parse"):
+        graph = parse_file(Graph(), file_path)
+    metrics.count("triples", len(graph))
+    default_namespaces = set(Graph().namespaces())
+
+    with metrics.span("usage"):
+        types = defaultdict(set)
+        predicates = defaultdict(Counter)
+        for subject, predicate, obj in graph:
+            if predicate == RDF.type:
+                types[subject].add(str(obj))
+            else:
+                predicates[subject][str(predicate)] += 1
+
+        subjects = {}
+        classes = Counter()
+        properties = Counter()
+        for subject in types.keys() | predicates.keys():
+            subject_types = types.get(subject, set())
+            subject_predicates = predicates.get(subject, Counter())
+            if isinstance(subject, URIRef):
+                subjects[str(subject)] = (subject_types, subject_predicates)
+                continue
+            classes.update(subject_types)
+            for predicate, count in subject_predicates.items():
+                for subject_type in subject_types or (None,):
+                    properties[(predicate, subject_type)] += count
+
+    return {
+        "namespaces": [
+            [prefix, str(namespace)]
+            for prefix, namespace in graph.namespaces()
+            if (prefix, namespace) not in default_namespaces
+        ],
+        "subjects": subjects,
+        "classes": classes,
+        "properties": properties,
+    }
+
+
+def file_content_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_file_usage(file_path, cache_dir):
+    """
+    file_usage, stored under cache_dir by content hash. Returns the usage and
+    whether it came from the cache.
+    """
+    with metrics.span("hash"):
+        key = file_content_hash(file_path)
+    cache_file = Path(cache_dir) / key[:2] / f"{key}-v{USAGE_CACHE_VERSION}.json"
+    if cache_file.exists():
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        usage = {
+            "namespaces": data["namespaces"],
+            "subjects": {
+                subject: (set(subject_types), Counter(subject_predicates))
+                for subject, (subject_types, subject_predicates) in data[
+                    "subjects"
+                ].items()
+            },
+            "classes": Counter(data["classes"]),
+            "properties": Counter(
+                {(prop, parent): count for prop, parent, count in data["properties"]}
+            ),
+        }
+        return usage, True
+
+    usage = file_usage(file_path)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Several processes may cache the same content at once
+    tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "namespaces": usage["namespaces"],
+                "subjects": {
+                    subject: [sorted(subject_types), dict(subject_predicates)]
+                    for subject, (subject_types, subject_predicates) in usage[
+                        "subjects"
+                    ].items()
+                },
+                "classes": dict(usage["classes"]),
+                "properties": [
+                    [prop, parent, count]
+                    for (prop, parent), count in usage["properties"].items()
+                ],
+            },
+            f,
+        )
+    tmp_file.replace(cache_file)
+    return usage, False
+
+
+def reduce_usage(usages, use_prefixes=False):
+    """
+    Reduce step: join the types and predicates of each IRI subject across
+    files and add the blank node usage of every file, giving the classes
+    and (property, parent) combinations of a graph of all files. Prefixes
+    are bound in file order, as they would be when parsing all files into
+    one graph, before URIs are turned into prefixed names.
+    """
+    graph = Graph()
+    types = defaultdict(set)
+    predicates = defaultdict(Counter)
+    classes = Counter()
+    properties = Counter()
+    for usage in usages:
+        for prefix, namespace in usage["namespaces"]:
+            graph.bind(prefix, namespace)
+        for subject, (subject_types, subject_predicates) in usage["subjects"].items():
+            types[subject].update(subject_types)
+            predicates[subject].update(subject_predicates)
+        classes.update(usage["classes"])
+        properties.update(usage["properties"])
+
+    for subject_types in types.values():
+        classes.update(subject_types)
+    for subject, subject_predicates in predicates.items():
+        subject_types = types.get(subject) or (None,)
+        for predicate, count in subject_predicates.items():
+            for subject_type in subject_types:
+                properties[(predicate, subject_type)] += count
+
+    if use_prefixes:
+        with metrics.span("qnames"):
+
+            def name(uri):
+                return to_prefixed(graph, uri) if uri is not None else None
+
+            prefixed_classes = Counter()
+            for cls, count in classes.items():
+                prefixed_classes[name(cls)] += count
+            prefixed_properties = Counter()
+            for (prop, parent), count in properties.items():
+                prefixed_properties[(name(prop), name(parent))] += count
+            classes, properties = prefixed_classes, prefixed_properties
+
+    return {"classes": classes, "properties": properties}
+
+
+def load_usage_from_path(path, cache_dir, use_prefixes=False):
+    path = Path(path)
+    if path.is_file():
+        files = [path]
+    elif path.is_dir():
+        files = [file for file in path.rglob("*") if file.is_file()]
+    else:
+        raise ValueError("Invalid path: must be a file or directory")
+
+    usages = []
+    hits = 0
+    for file in files:
+        try:
+            usage, hit = cached_file_usage(file, cache_dir)
+        except Exception as e:
+            metrics.count("failed_files")
+            print(f"⚠️ Failed to parse {file}: {e}")
+            continue
+        hits += hit
+        usages.append(usage)
+    metrics.count("files", len(files))
+    metrics.count("cache_hits", hits)
+    print(f"♻️ Reused {hits}/{len(files)} cached files", file=sys.stderr)
+    return reduce_usage(usages, use_prefixes)
+
+
+def scannable_files(path):
+    """The files under path if they are all N-Triples/N-Quads, else None"""
+    path = Path(path)
+    if path.is_file():
+        files = [path]
+    elif path.is_dir():
+        files = [file for file in path.rglob("*") if file.is_file()]
+    else:
+        raise ValueError("Invalid path: must be a file or directory")
+    if files and all(is_scannable(file) for file in files):
+        return files
+    return None
+
+
+def scan_usage(files, use_prefixes=False, processes=1):
+    """
+    Class and (property, parent) usage of N-Triples/N-Quads files without
+    building a Graph. Gives the same result as get_all_classes and
+    get_all_properties on the loaded files, except for classes that are
+    blank nodes or literals, which are skipped, and for the numbering of
+    the ns1, ns2... prefixes rdflib generates.
+    """
+    with metrics.span("scan"):
+        classes, properties, triples = scan_files(files, processes)
+    metrics.count("files", len(files))
+    metrics.count("triples", triples)
+
+    if use_prefixes:
+        # Line-based files declare no prefixes, so the rdflib defaults apply
+        with metrics.span("qnames"):
+            graph = Graph()
+
+            def name(uri):
+                return to_prefixed(graph, uri) if uri is not None else None
+
+            classes = {name(cls) for cls in sorted(classes)}
+            properties = {
+                (name(prop), name(parent))
+                for prop, parent in sorted(properties, key=lambda r: (r[0], r[1] or ""))
+            }
+
+    return {"classes": classes, "properties": properties}
+
+
+def filter_usage(usage, filter_entities=None, property_parents=None):
+    """Apply the same filters as get_all_classes and get_all_properties"""
+    classes = sorted(
+        cls
+        for cls in usage["classes"]
+        if filter_entities is None or cls in filter_entities
+    )
+    properties = []
+    for prop, parent in usage["properties"]:
+        if filter_entities is not None and prop not in filter_entities:
+            continue
+        if property_parents is not None and prop in property_parents:
+            if parent not in property_parents[prop]:
+                continue
+        properties.append((prop, parent))
+    return classes, sorted(properties, key=lambda r: (r[0], r[1] or ""))
 
 
 def export_to_csv(classes, properties, output_file):
@@ -349,7 +642,32 @@ def main():
         default="parent",
         help="Name of the column containing parent class information (default: parent)",
     )
+    parser.add_argument(
+        "--cache",
+        help="Directory for per-file usage results, reused for unchanged files (data mode only)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of processes scanning byte ranges of N-Triples/N-Quads input",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        help="Export stage timings, counters and peak RSS (.json for JSON, "
+        "anything else for OpenMetrics text); can be given more than once",
+    )
     args = parser.parse_args()
+    metrics.reset("extract_entity_usage")
+    with metrics.span("total"):
+        run(args)
+    for metrics_file in args.metrics:
+        metrics.export(metrics_file)
+
+
+def run(args):
 
     # Load filter entities if specified
     filter_entities = None
@@ -361,12 +679,14 @@ def main():
             )
             sys.exit(1)
 
-        filter_entities, property_parents = load_filter_entities(
-            args.filter_csv,
-            filter_column=args.filter_column,
-            filter_value=args.filter_value,
-            parent_column=args.parent_column,
-        )
+        with metrics.span("load_filter"):
+            filter_entities, property_parents = load_filter_entities(
+                args.filter_csv,
+                filter_column=args.filter_column,
+                filter_value=args.filter_value,
+                parent_column=args.parent_column,
+            )
+        metrics.count("filter_entities", len(filter_entities))
 
         filter_msg = f"Filtering results to {len(filter_entities)} entities where {args.filter_column}={args.filter_value}"
         if args.parent_column:
@@ -374,19 +694,44 @@ def main():
         filter_msg += f" from {args.filter_csv}"
         # print(filter_msg)
 
-    graph = load_graph_from_path(args.input)
-
-    if args.shacl:
-        classes = get_shacl_classes(
-            graph, use_prefixes=args.prefixed, filter_entities=filter_entities
-        )
-        properties = get_shacl_properties(
-            graph,
-            use_prefixes=args.prefixed,
-            filter_entities=filter_entities,
-            property_parents=property_parents,
-        )
+    scan = None if args.shacl or args.cache else scannable_files(args.input)
+    if scan:
+        scanned = scan_usage(scan, use_prefixes=args.prefixed, processes=args.processes)
+        with metrics.span("filter"):
+            classes, properties = filter_usage(
+                scanned, filter_entities, property_parents
+            )
+    elif args.cache and not args.shacl:
+        usage = load_usage_from_path(args.input, args.cache, use_prefixes=args.prefixed)
+        with metrics.span("filter"):
+            classes, properties = filter_usage(usage, filter_entities, property_parents)
+    elif args.shacl and Path(args.input).is_file():
+        # shacl_index builds on this module, so it is imported only here
+        from shacl_index import index_entities, load_index
+
+        with metrics.span("index"):
+            index = load_index(args.input)
+        with metrics.span("shapes"):
+            classes, properties = index_entities(
+                index,
+                use_prefixes=args.prefixed,
+                filter_entities=filter_entities,
+                property_parents=property_parents,
+            )
+    elif args.shacl:
+        graph = load_graph_from_path(args.input)
+        with metrics.span("shapes"):
+            classes = get_shacl_classes(
+                graph, use_prefixes=args.prefixed, filter_entities=filter_entities
+            )
+            properties = get_shacl_properties(
+                graph,
+                use_prefixes=args.prefixed,
+                filter_entities=filter_entities,
+                property_parents=property_parents,
+            )
     else:
+        graph = load_graph_from_path(args.input)
         classes = get_all_classes(
             graph, use_prefixes=args.prefixed, filter_entities=filter_entities
         )
@@ -397,18 +742,22 @@ def main():
             property_parents=property_parents,
         )
 
-    for cls in classes:
-        print(cls)
-    for prop, parent in properties:
-        if parent:
-            print(f"{parent} {prop}")
-        else:
-            print(f"- {prop}")
-
-    if args.csv:
-        export_to_csv(classes, properties, args.csv)
-    if args.json:
-        export_to_json(classes, properties, args.json)
+    metrics.count("classes", len(classes))
+    metrics.count("properties", len(properties))
+
+    with metrics.span("export"):
+        for cls in classes:
+            print(cls)
+        for prop, parent in properties:
+            if parent:
+                print(f"{parent} {prop}")
+            else:
+                print(f"- {prop}")
+
+        if args.csv:
+            export_to_csv(classes, properties, args.csv)
+        if args.json:
+            export_to_json(classes, properties, args.json)
 
 
 if __name__ == "__main__":
@@ -12,6 +12,177 @@ import argparse
 import os
 import re
 
+# Define namespaces
+NAMESPACES = {
+    "xmi": "http://www.omg.org/spec/XMI/20131001",
+    "uml": "http://www.omg.org/spec/UML/20131001",
+}
+
+CSV_FIELDS = ["parent", "entity", "qualifier", "cardinality", "type"]
+
+
+def extract_classes(root):
+    """Names of the UML classes of the model"""
+    return [
+        class_elem.get("name")
+        for class_elem in root.findall("./xmi:Extension/elements/element", NAMESPACES)
+        if class_elem.get(f"{{{NAMESPACES['xmi']}}}type") == "uml:Class"
+        and class_elem.get("name")
+    ]
+
+
+def extract_attributes(root):
+    """
+    Extract class attributes. Besides the CSV fields, each entry carries the
+    attribute type in "range".
+    """
+    result_data = []
+    for class_elem in root.findall("./xmi:Extension/elements/element", NAMESPACES):
+        class_name = class_elem.get("name")
+
+        # Skip if not a class or no name
+        if class_name is None:
+            continue
+
+        # Find attributes for this class
+        for attr in class_elem.findall("./attributes/attribute", NAMESPACES):
+            attr_name = attr.get("name")
+
+            # Skip if no attribute name
+            if attr_name is None:
+                continue
+
+            # Get stereotype
+            stereotype_elem = attr.find("./stereotype", NAMESPACES)
+            stereotype = "None"
+            if stereotype_elem is not None:
+                stereotype = stereotype_elem.get("stereotype", "None")
+
+            # Get cardinality
+            bounds_elem = attr.find("./bounds", NAMESPACES)
+            min_cardinality = "0"  # Default
+            max_cardinality = "1"  # Default
+
+            if bounds_elem is not None:
+                min_cardinality = bounds_elem.get("lower", "0")
+                max_cardinality = bounds_elem.get("upper", "1")
+                if max_cardinality == "*":
+                    max_cardinality = "n"
+
+            cardinality = f"{min_cardinality}..{max_cardinality}"
+
+            # Get type
+            properties_elem = attr.find("./properties", NAMESPACES)
+            attr_type = None
+            if properties_elem is not None:
+                attr_type = properties_elem.get("type")
+
+            # Add to results
+            result_data.append(
+                {
+                    "parent": class_name,
+                    "entity": attr_name,
+                    "qualifier": stereotype,
+                    "cardinality": cardinality,
+                    "type": "attribute",
+                    "range": attr_type,
+                }
+            )
+    return result_data
+
+
+def extract_relationships(root):
+    """
+    Extract relationships (connectors). Besides the CSV fields, each entry
+    carries the target class in "range".
+    """
+    result_data = []
+    for connector in root.findall("./xmi:Extension/connectors/connector", NAMESPACES):
+        # Get source class (parent)
+        source = connector.find("./source", NAMESPACES)
+        if source is None:
+            continue
+
+        source_model = source.find("./model", NAMESPACES)
+        if source_model is None:
+            continue
+
+        parent_class = source_model.get("name")
+        if parent_class is None:
+            continue
+
+        # Get target role (relationship name)
+        target = connector.find("./target", NAMESPACES)
+        if target is None:
+            continue
+
+        role = target.find("./role", NAMESPACES)
+        if role is None:
+            continue
+
+        relationship_name = role.get("name")
+        if relationship_name is None:
+            continue
+
+        # Get cardinality
+        target_type = target.find("./type", NAMESPACES)
+        cardinality = "0..1"  # Default
+        if target_type is not None:
+            multiplicity = target_type.get("multiplicity")
+            if multiplicity:
+                # A bare "*" is UML shorthand for "0..*"
+                if multiplicity in ("0..*", "*", "n"):
+                    cardinality = "0..n"
+                elif multiplicity == "1..*":
+                    cardinality = "1..n"
+                else:
+                    cardinality = multiplicity.replace("*", "n")
+
+        # Get target class
+        target_model = target.find("./model", NAMESPACES)
+        target_class = None
+        if target_model is not None:
+            target_class = target_model.get("name")
+
+        # Get stereotype/qualifier from labels
+        qualifier = "None"
+        labels = connector.find("./labels", NAMESPACES)
+        if labels is not None:
+            mb_value = labels.get("mb")
+            if mb_value:
+                # Extract text between � characters
+                match = re.search(r"�(\w+)�", mb_value)
+                if match:
+                    qualifier = match.group(1)
+
+        # Also check properties for stereotype
+        if qualifier == "None":
+            properties = connector.find("./properties", NAMESPACES)
+            if properties is not None:
+                qualifier = properties.get("stereotype", "None")
+
+        # Add to results
+        result_data.append(
+            {
+                "parent": parent_class,
+                "entity": relationship_name,
+                "qualifier": qualifier,
+                "cardinality": cardinality,
+                "type": "relationship",
+                "range": target_class,
+            }
+        )
+    return result_data
+
+
+def extract_entities(xmi_file):
+    """Parse the XMI file and return its classes, attributes and relationships"""
+    root = ET.parse(xmi_file).getroot()
+    return (
+        extract_classes(root),
+        extract_attributes(root) + extract_relationships(root),
+    )
+
 
 def main():
     # Parse command line arguments
@@ -35,138 +206,22 @@ def main():
         tree = ET.parse(args.xmi_file)
         root = tree.getroot()
 
-        # Define namespaces
-        namespaces = {
-            "xmi": "http://www.omg.org/spec/XMI/20131001",
-            "uml": "http://www.omg.org/spec/UML/20131001",
-        }
-
         # List to store all attribute and relationship data
         result_data = []
 
         # Extract attributes
         print("Extracting attributes...")
-        for class_elem in root.findall("./xmi:Extension/elements/element", namespaces):
-            class_name = class_elem.get("name")
-
-            # Skip if not a class or no name
-            if class_name is None:
-                continue
-
-            # Find attributes for this class
-            for attr in class_elem.findall("./attributes/attribute", namespaces):
-                attr_name = attr.get("name")
-
-                # Skip if no attribute name
-                if attr_name is None:
-                    continue
-
-                # Get stereotype
-                stereotype_elem = attr.find("./stereotype", namespaces)
-                stereotype = "None"
-                if stereotype_elem is not None:
-                    stereotype = stereotype_elem.get("stereotype", "None")
-
-                # Get cardinality
-                bounds_elem = attr.find("./bounds", namespaces)
-                min_cardinality = "0"  # Default
-                max_cardinality = "1"  # Default
-
-                if bounds_elem is not None:
-                    min_cardinality = bounds_elem.get("lower", "0")
-                    max_cardinality = bounds_elem.get("upper", "1")
-                    if max_cardinality == "*":
-                        max_cardinality = "n"
-
-                cardinality = f"{min_cardinality}..{max_cardinality}"
-
-                # Add to results
-                result_data.append(
-                    {
-                        "parent": class_name,
-                        "entity": attr_name,
-                        "qualifier": stereotype,
-                        "cardinality": cardinality,
-                        "type": "attribute",
-                    }
-                )
+        result_data.extend(extract_attributes(root))
 
         # Extract relationships (connectors)
         print("Extracting relationships...")
-        for connector in root.findall(
-            "./xmi:Extension/connectors/connector", namespaces
-        ):
-            # Get source class (parent)
-            source = connector.find("./source", namespaces)
-            if source is None:
-                continue
-
-            source_model = source.find("./model", namespaces)
-            if source_model is None:
-                continue
-
-            parent_class = source_model.get("name")
-            if parent_class is None:
-                continue
-
-            # Get target role (relationship name)
-            target = connector.find("./target", namespaces)
-            if target is None:
-                continue
-
-            role = target.find("./role", namespaces)
-            if role is None:
-                continue
-
-            relationship_name = role.get("name")
-            if relationship_name is None:
-                continue
-
-            # Get cardinality
-            target_type = target.find("./type", namespaces)
-            cardinality = "0..1"  # Default
-            if target_type is not None:
-                multiplicity = target_type.get("multiplicity")
-                if multiplicity:
-                    if multiplicity == "0..*":
-                        cardinality = "0..n"
-                    elif multiplicity == "1..*":
-                        cardinality = "1..n"
-                    else:
-                        cardinality = multiplicity.replace("*", "n")
-
-            # Get stereotype/qualifier from labels
-            qualifier = "None"
-            labels = connector.find("./labels", namespaces)
-            if labels is not None:
-                mb_value = labels.get("mb")
-                if mb_value:
-                    # Extract text between � characters
-                    match = re.search(r"�(\w+)�", mb_value)
-                    if match:
-                        qualifier = match.group(1)
-
-            # Also check properties for stereotype
-            if qualifier == "None":
-                properties = connector.find("./properties", namespaces)
-                if properties is not None:
-                    qualifier = properties.get("stereotype", "None")
-
-            # Add to results
-            result_data.append(
-                {
-                    "parent": parent_class,
-                    "entity": relationship_name,
-                    "qualifier": qualifier,
-                    "cardinality": cardinality,
-                    "type": "relationship",
-                }
-            )
+        result_data.extend(extract_relationships(root))
 
         # Write results to a CSV file
         with open(args.output, "w", newline="") as csvfile:
-            fieldnames = ["parent", "entity", "qualifier", "cardinality", "type"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(
+                csvfile, fieldnames=CSV_FIELDS, extrasaction="ignore"
+            )
 
             writer.writeheader()
             for data in result_data:
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Generates the cardinality and range part of the SHACL shapes (sh:minCount,
+sh:maxCount, sh:class and sh:datatype, with the NodeShapes that hold them)
+directly from the XMI conceptual model, without the model2owl toolchain.
+Can check the generated constraints against the committed shapes file, so
+that model edits are validated in seconds.
+"""
+
+import argparse
+import sys
+import xml.etree.ElementTree as ET
+
+from rdflib import RDF, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import SH
+
+from extract_uml_entities import extract_entities
+
+NAMESPACES_FILE = "implementation/dcat_ap_lu/model2owl-config/namespaces.xml"
+XMI_FILE = "implementation/dcat_ap_lu/xmi_conceptual_model/dcat_ap_lu_CM.xml"
+SHAPES_FILE = "implementation/dcat_ap_lu/shacl_shapes/dcat_ap_lu_CM_shapes.ttl"
+
+# base-shape-uri and defaultDelimiter from model2owl-config/config-parameters.xsl
+DEFAULT_DELIMITER = "#"
+SHAPES_NAMESPACE = Namespace(
+    "https://mindig_lu.gitlab.io/DCAT-AP-LU" + DEFAULT_DELIMITER
+)
+
+SHAPE_TYPES = {SH.NodeShape, SH.PropertyShape}
+
+CONSTRAINT_PREDICATES = {
+    SH.targetClass,
+    SH.property,
+    SH.path,
+    SH.minCount,
+    SH.maxCount,
+    SH["class"],
+    SH.datatype,
+}
+
+
+def load_namespaces(namespaces_file):
+    """
+    Prefix to namespace IRI map from the model2owl namespaces.xml. Like
+    model2owl, a namespace without a trailing delimiter gets the default one.
+    """
+    prefixes = {}
+    for prefix in ET.parse(namespaces_file).getroot():
+        if prefix.tag.endswith("prefix"):
+            value = prefix.get("value").strip()
+            if not value.endswith(("/", "#")):
+                value += DEFAULT_DELIMITER
+            prefixes[prefix.get("name")] = value
+    return prefixes
+
+
+def expand(qname, prefixes):
+    prefix, _, local = qname.partition(":")
+    if prefix not in prefixes:
+        raise ValueError(f"Unknown prefix '{prefix}' in '{qname}'")
+    return URIRef(prefixes[prefix] + local)
+
+
+def shape_name(*qnames):
+    """model2owl shape names join the qnames with '-', e.g. dcat-Dataset-dct-title"""
+    return SHAPES_NAMESPACE["-".join(qname.replace(":", "-") for qname in qnames)]
+
+
+def parse_cardinality(cardinality):
+    """
+    '1..n' -> (1, None); a single bound like '1' means exactly that many,
+    except a bare 'n' or '*', which means any number
+    """
+    if cardinality in ("n", "*"):
+        return 0, None
+    lower, _, upper = cardinality.partition("..")
+    upper = upper or lower
+    return int(lower), None if upper in ("n", "*") else int(upper)
+
+
+def generate_constraints(classes, entities, prefixes):
+    """Build the constraint part of the shapes graph in memory"""
+    graph = Graph()
+    for prefix, namespace in prefixes.items():
+        if prefix:
+            graph.bind(prefix, namespace, override=False)
+    graph.bind("sh", SH)
+    graph.bind("core-res", SHAPES_NAMESPACE)
+
+    for class_name in classes:
+        node_shape = shape_name(class_name)
+        graph.add((node_shape, RDF.type, SH.NodeShape))
+        graph.add((node_shape, SH.targetClass, expand(class_name, prefixes)))
+
+    for entity in entities:
+        node_shape = shape_name(entity["parent"])
+        property_shape = shape_name(entity["parent"], entity["entity"])
+        graph.add((node_shape, SH.property, property_shape))
+        graph.add((property_shape, RDF.type, SH.PropertyShape))
+        graph.add((property_shape, SH.path, expand(entity["entity"], prefixes)))
+
+        min_count, max_count = parse_cardinality(entity["cardinality"])
+        if min_count > 0:
+            graph.add((property_shape, SH.minCount, Literal(min_count)))
+        if max_count is not None:
+            graph.add((property_shape, SH.maxCount, Literal(max_count)))
+
+        if entity["range"]:
+            range_iri = expand(entity["range"], prefixes)
+            if entity["type"] == "relationship":
+                graph.add((property_shape, SH["class"], range_iri))
+            else:
+                graph.add((property_shape, SH.datatype, range_iri))
+    return graph
+
+
+def constraint_subgraph(shapes_graph):
+    """Only the triples of a shapes graph that the generator is responsible for"""
+    graph = Graph()
+    for triple in shapes_graph:
+        _, predicate, obj = triple
+        if predicate in CONSTRAINT_PREDICATES or (
+            predicate == RDF.type and obj in SHAPE_TYPES
+        ):
+            graph.add(triple)
+    return graph
+
+
+def compare_constraints(generated, shapes_graph):
+    """Return (missing, unexpected) triples of the committed shapes"""
+    committed = constraint_subgraph(shapes_graph)
+    generated = constraint_subgraph(generated)
+    missing = sorted(set(generated) - set(committed))
+    unexpected = sorted(set(committed) - set(generated))
+    return missing, unexpected
+
+
+def print_differences(missing, unexpected, graph):
+    def fmt(triple):
+        return " ".join(term.n3(graph.namespace_manager) for term in triple)
+
+    for triple in missing:
+        print(f"  ➕ {fmt(triple)}")
+    for triple in unexpected:
+        print(f"  ➖ {fmt(triple)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate SHACL cardinality and range constraints from the XMI model"
+    )
+    parser.add_argument(
+        "xmi_file", nargs="?", default=XMI_FILE, help="Path to the XMI file"
+    )
+    parser.add_argument(
+        "--namespaces", default=NAMESPACES_FILE, help="model2owl namespaces.xml"
+    )
+    parser.add_argument(
+        "-o", "--output", help="Save the generated constraints as Turtle"
+    )
+    parser.add_argument(
+        "--check",
+        nargs="?",
+        const=SHAPES_FILE,
+        help="Compare with a shapes file (default: the committed shapes)",
+    )
+    args = parser.parse_args()
+
+    prefixes = load_namespaces(args.namespaces)
+    classes, entities = extract_entities(args.xmi_file)
+    generated = generate_constraints(classes, entities, prefixes)
+    print(
+        f"📦 Generated {len(classes)} node shapes and {len(entities)} property shapes "
+        f"({len(generated)} triples)"
+    )
+
+    if args.output:
+        generated.serialize(args.output, format="turtle")
+        print(f"✅ Turtle saved to {args.output}")
+
+    if args.check:
+        shapes_graph = Graph().parse(args.check)
+        missing, unexpected = compare_constraints(generated, shapes_graph)
+        if missing or unexpected:
+            print_differences(missing, unexpected, shapes_graph)
+            print(
+                f"❌ {args.check} differs from the model: "
+                f"{len(missing)} missing, {len(unexpected)} unexpected"
+            )
+            sys.exit(1)
+        print(f"✅ {args.check} matches the model")
+
+
+if __name__ == "__main__":
+    main()
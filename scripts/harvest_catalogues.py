@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Harvests publisher catalogues concurrently and validates them as they
+arrive. Downloads run on asyncio with pooled keep-alive connections, a
+per-host concurrency limit and conditional requests (ETag/Last-Modified),
+while each downloaded document is handed straight to a pool of validation
+processes, so that download latency and validation CPU time overlap.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import ssl
+import sys
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from rdflib import Graph
+
+from aggregate_violations import iter_validation_results
+from extract_entity_usage import parse_file
+from pipeline_metrics import metrics
+from shacl_index import load_index, validate_dispatched
+from validation_runner import DEFAULT_SHAPES_FILE
+
+USER_AGENT = "dcat-ap-lu-harvester/0.1"
+ACCEPT = (
+    "text/turtle, application/rdf+xml;q=0.9, application/ld+json;q=0.9, "
+    "application/n-triples;q=0.8, application/n-quads;q=0.8, */*;q=0.1"
+)
+
+# File extension by media type, so parse_file picks the right parser
+MEDIA_TYPE_SUFFIXES = {
+    "text/turtle": ".ttl",
+    "application/x-turtle": ".ttl",
+    "application/rdf+xml": ".rdf",
+    "application/xml": ".rdf",
+    "text/xml": ".rdf",
+    "application/ld+json": ".jsonld",
+    "application/json": ".jsonld",
+    "application/n-triples": ".nt",
+    "application/n-quads": ".nq",
+    "text/n3": ".n3",
+}
+
+STATE_FILE = "harvest_state.json"
+# Seconds between saves of the state while harvesting, so that a crash
+# keeps the ETags of the catalogues harvested so far
+STATE_SAVE_INTERVAL = 5
+REPORT_FIELDS = [
+    "url",
+    "status",
+    "path",
+    "bytes",
+    "download_seconds",
+    "conforms",
+    "violations",
+    "triples",
+    "error",
+]
+
+CHUNK_SIZE = 1 << 16
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class HttpError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, url, status, headers):
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections, pooled by (scheme, host, port). At most
+    per_host requests run against the same host at once, which also bounds
+    the number of connections kept open to it.
+    """
+
+    def __init__(self, per_host=4, timeout=60):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.idle = defaultdict(list)
+        self.limits = {}
+        self.ssl_context = ssl.create_default_context()
+
+    def _limit(self, key):
+        if key not in self.limits:
+            self.limits[key] = asyncio.Semaphore(self.per_host)
+        return self.limits[key]
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        while self.idle[key]:
+            reader, writer = self.idle[key].pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host,
+                port,
+                ssl=self.ssl_context if scheme == "https" else None,
+            ),
+            self.timeout,
+        )
+        metrics.count("connections")
+        return reader, writer, False
+
+    async def _wait(self, awaitable):
+        """Await one read or write, so that the timeout applies to each of them"""
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+    async def _read_exactly(self, reader, size, write):
+        """Pass size bytes to write as they arrive"""
+        while size:
+            data = await self._wait(reader.read(min(size, CHUNK_SIZE)))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", size)
+            size -= len(data)
+            write(data)
+
+    async def get(self, url, headers, sink, reset=None):
+        """
+        GET url, streaming the body of a 200 response into sink (a callable
+        taking bytes). A reused connection that the server has closed in the
+        meantime is retried once on a fresh one; reset is called before each
+        attempt to discard what a failed one wrote to the sink.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise HttpError(f"Unsupported URL scheme: {url}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        host = parts.netloc.rpartition("@")[2]
+
+        async with self._limit(key):
+            for attempt in range(2):
+                reader, writer, reused = await self._connect(key)
+                if reset is not None:
+                    reset()
+                try:
+                    response, keep_alive = await self._exchange(
+                        reader, writer, host, target, headers, sink
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                response.url = url
+                if keep_alive:
+                    self.idle[key].append((reader, writer))
+                else:
+                    writer.close()
+                return response
+
+    async def _exchange(self, reader, writer, host, target, headers, sink):
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self._wait(writer.drain())
+
+        status_line = await self._wait(reader.readline())
+        if not status_line:
+            raise HttpError("Connection closed before the response")
+        try:
+            version, status = status_line.decode("latin-1").split()[:2]
+            status = int(status)
+        except ValueError:
+            raise HttpError(f"Malformed status line: {status_line!r}")
+
+        response_headers = {}
+        while True:
+            line = await self._wait(reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and (
+            response_headers.get("connection", "").lower() != "close"
+        )
+        response = Response(None, status, response_headers)
+        # Only the body of a successful response is kept, others are drained
+        body_sink = sink if status == 200 else (lambda data: None)
+        decompress = None
+        if response_headers.get("content-encoding", "").lower() == "gzip":
+            decompress = zlib.decompressobj(wbits=31)
+
+        def write(data):
+            body_sink(decompress.decompress(data) if decompress else data)
+
+        if status in (204, 304) or 100 <= status < 200:
+            return response, keep_alive
+        if "chunked" in response_headers.get("transfer-encoding", "").lower():
+            while True:
+                size = int((await self._wait(reader.readline())).split(b";")[0], 16)
+                if size == 0:
+                    # Skip trailers
+                    trailer = None
+                    while trailer not in (b"\r\n", b"\n", b""):
+                        trailer = await self._wait(reader.readline())
+                    break
+                await self._read_exactly(reader, size, write)
+                await self._wait(reader.readexactly(2))
+        elif "content-length" in response_headers:
+            await self._read_exactly(
+                reader, int(response_headers["content-length"]), write
+            )
+        else:
+            keep_alive = False
+            while True:
+                data = await self._wait(reader.read(CHUNK_SIZE))
+                if not data:
+                    break
+                write(data)
+        if decompress:
+            body_sink(decompress.flush())
+        return response, keep_alive
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+def document_path(output_dir, url, content_type=None):
+    """Stable file name for a URL, with a suffix matching its media type"""
+    parts = urlsplit(url)
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    suffix = MEDIA_TYPE_SUFFIXES.get(media_type) or Path(parts.path).suffix.lower()
+    if suffix not in MEDIA_TYPE_SUFFIXES.values():
+        suffix = ".rdf"
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return Path(output_dir) / (parts.hostname or "local") / f"{name}{suffix}"
+
+
+async def download(pool, url, output_dir, previous=None):
+    """
+    Conditionally download url into output_dir, following redirects. Returns
+    a result dict; status is "downloaded" or "not_modified", with the ETag
+    and Last-Modified to send next time.
+    """
+    previous = previous or {}
+    headers = {"User-Agent": USER_AGENT, "Accept": ACCEPT, "Accept-Encoding": "gzip"}
+    if previous.get("path") and Path(previous["path"]).exists():
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    part_file = Path(output_dir) / f".{hashlib.sha1(url.encode('utf-8')).hexdigest()}.part"
+    part_file.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    location = url
+    try:
+        with open(part_file, "wb") as f:
+
+            def reset():
+                f.seek(0)
+                f.truncate()
+
+            for _ in range(MAX_REDIRECTS + 1):
+                response = await pool.get(location, headers, f.write, reset)
+                if response.status not in REDIRECT_STATUSES:
+                    break
+                if "location" not in response.headers:
+                    raise HttpError(f"HTTP {response.status} without Location")
+                location = urljoin(location, response.headers["location"])
+            else:
+                raise HttpError("Too many redirects")
+            size = f.tell()
+
+        result = {
+            "url": url,
+            "etag": response.headers.get("etag", previous.get("etag")),
+            "last_modified": response.headers.get(
+                "last-modified", previous.get("last_modified")
+            ),
+            "download_seconds": round(time.perf_counter() - start, 3),
+        }
+        if response.status == 304:
+            if "If-None-Match" not in headers and "If-Modified-Since" not in headers:
+                raise HttpError("HTTP 304 to an unconditional request")
+            result.update(status="not_modified", path=previous["path"], bytes=0)
+            return result
+        if response.status != 200:
+            raise HttpError(f"HTTP {response.status}")
+
+        path = document_path(output_dir, url, response.headers.get("content-type"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_file.replace(path)
+        metrics.count("bytes", size)
+        result.update(status="downloaded", path=str(path), bytes=size)
+        return result
+    finally:
+        part_file.unlink(missing_ok=True)
+
+
+# Shapes graph and index of each validation process, loaded by _init_worker
+_SHAPES = None
+_INDEX = None
+
+
+def _init_worker(shapes_file):
+    global _SHAPES, _INDEX
+    _SHAPES = Graph().parse(shapes_file)
+    _INDEX = load_index(shapes_file, _SHAPES)
+
+
+def validate_document(path):
+    """Validate one downloaded document in a worker process"""
+    data_graph = parse_file(Graph(), path)
+    conforms, report_graph, _ = validate_dispatched(data_graph, _SHAPES, _INDEX)
+    return {
+        "conforms": conforms,
+        "violations": sum(1 for _ in iter_validation_results(report_graph)),
+        "triples": len(data_graph),
+    }
+
+
+async def harvest_one(url, pool, output_dir, state, executor, limit, checkpoint=None):
+    """
+    Download url, then validate it in the executor unless it is unchanged.
+    checkpoint is called once its state is recorded.
+    """
+    previous = state.get(url, {})
+    async with limit:
+        try:
+            result = await download(pool, url, output_dir, previous)
+        except Exception as e:
+            metrics.count("failed")
+            print(f"⚠️ Failed to download {url}: {e}")
+            return {"url": url, "status": "failed", "error": str(e) or type(e).__name__}
+    metrics.count(result["status"])
+
+    if result["status"] == "not_modified" and "conforms" in previous:
+        # Unchanged since the last run, so is its validation result
+        for field in ("conforms", "violations", "triples"):
+            result[field] = previous.get(field)
+    elif executor is not None:
+        # The download slot is free again while the document is validated
+        loop = asyncio.get_running_loop()
+        try:
+            result.update(
+                await loop.run_in_executor(executor, validate_document, result["path"])
+            )
+        except Exception as e:
+            metrics.count("invalid_documents")
+            result["error"] = str(e) or type(e).__name__
+
+    state[url] = {
+        field: result[field]
+        for field in ("etag", "last_modified", "path", "conforms", "violations", "triples")
+        if result.get(field) is not None
+    }
+    if checkpoint is not None:
+        checkpoint()
+    print_result(result)
+    return result
+
+
+async def harvest(urls, output_dir, shapes_file, concurrency, per_host, workers, timeout):
+    state_file = Path(output_dir) / STATE_FILE
+    state = load_state(state_file)
+    saved_at = time.monotonic()
+
+    def checkpoint():
+        nonlocal saved_at
+        if time.monotonic() - saved_at >= STATE_SAVE_INTERVAL:
+            save_state(state, state_file)
+            saved_at = time.monotonic()
+
+    pool = ConnectionPool(per_host=per_host, timeout=timeout)
+    limit = asyncio.Semaphore(concurrency)
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(shapes_file,)
+        )
+    try:
+        results = await asyncio.gather(
+            *(
+                harvest_one(url, pool, output_dir, state, executor, limit, checkpoint)
+                for url in urls
+            )
+        )
+    finally:
+        pool.close()
+        if executor is not None:
+            executor.shutdown()
+        save_state(state, state_file)
+    return results
+
+
+def load_urls(url_file):
+    """One URL per line; blank lines and # comments are skipped"""
+    urls = []
+    with open(url_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line and line not in urls:
+                urls.append(line)
+    return urls
+
+
+def load_state(state_file):
+    if Path(state_file).exists():
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, state_file):
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp_file.replace(state_file)
+
+
+def print_result(result):
+    if result["status"] == "failed":
+        return
+    if "error" in result:
+        print(f"  ⚠️ {result['url']}: {result['error']}")
+    elif "conforms" not in result:
+        print(f"  📥 {result['url']} ({result['status']})")
+    elif result["conforms"]:
+        print(f"  ✅ {result['url']} ({result['status']})")
+    else:
+        print(
+            f"  ❌ {result['url']} ({result['status']}): "
+            f"{result['violations']} violations"
+        )
+
+
+def print_summary(results, seconds):
+    statuses = defaultdict(int)
+    for result in results:
+        statuses[result["status"]] += 1
+    print("\n📦 Harvest summary")
+    print(f"Catalogues: {len(results)}")
+    print(f"Downloaded: {statuses['downloaded']}")
+    print(f"Not modified: {statuses['not_modified']}")
+    print(f"Failed: {statuses['failed']}")
+    print(f"Non-conforming: {sum(1 for r in results if r.get('conforms') is False)}")
+    print(f"Elapsed: {seconds:.1f}s")
+
+
+def export_to_csv(results, output_file):
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+    print(f"✅ CSV saved to {output_file}")
+
+
+def export_to_json(results, output_file):
+    data = [
+        {field: result.get(field) for field in REPORT_FIELDS} for result in results
+    ]
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"✅ JSON saved to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Harvest catalogues concurrently and validate them as they arrive"
+    )
+    parser.add_argument("urls", help="File with one catalogue URL per line")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        default="harvest",
+        help="Where downloads and the conditional request state are kept",
+    )
+    parser.add_argument(
+        "-s",
+        "--shapes",
+        default=DEFAULT_SHAPES_FILE,
+        help="Path to the SHACL shapes file",
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=32, help="Downloads in flight overall"
+    )
+    parser.add_argument(
+        "--per-host", type=int, default=4, help="Downloads in flight per host"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=2,
+        help="Validation processes (0 to only download)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Timeout of each connect and read in seconds",
+    )
+    parser.add_argument("--csv", help="Export the results to CSV file")
+    parser.add_argument("--json", help="Export the results to JSON file")
+    parser.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        help="Export timings and counters (.json for JSON, else OpenMetrics)",
+    )
+    args = parser.parse_args()
+
+    urls = load_urls(args.urls)
+    if not urls:
+        print(f"Error: no URLs in {args.urls}")
+        sys.exit(1)
+
+    metrics.reset("harvest_catalogues")
+    start = time.perf_counter()
+    with metrics.span("total"):
+        results = asyncio.run(
+            harvest(
+                urls,
+                args.output_dir,
+                args.shapes,
+                args.concurrency,
+                args.per_host,
+                args.workers,
+                args.timeout,
+            )
+        )
+    print_summary(results, time.perf_counter() - start)
+
+    if args.csv:
+        export_to_csv(results, args.csv)
+    if args.json:
+        export_to_json(results, args.json)
+    for metrics_file in args.metrics:
+        metrics.export(metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON-LD ingestion for harvested catalogues. Contexts are compiled
+once and cached across files, and the items of a top-level @graph array are
+decoded and added to the target graph one by one instead of loading the whole
+document in memory. Items can only be decoded before the end of the document
+if its @context is known, so documents whose first key is not @context are
+loaded whole.
+"""
+
+import argparse
+import copy
+import json
+import warnings
+from pathlib import Path
+from urllib.parse import urljoin
+
+from rdflib import ConjunctiveGraph, Graph
+from rdflib.plugins.parsers.jsonld import Parser
+from rdflib.plugins.shared.jsonld.context import Context
+
+CHUNK_SIZE = 1 << 16
+
+# Number of @graph items handed to the rdflib JSON-LD parser at once
+BATCH_SIZE = 512
+
+# Compiled contexts, keyed by their (resolved) JSON source
+_CONTEXT_CACHE = {}
+
+
+def _resolve_context_source(context_data, base):
+    """Make remote/relative context references absolute so they can be cached"""
+    if isinstance(context_data, str):
+        return urljoin(base, context_data) if base else context_data
+    if isinstance(context_data, list):
+        return [_resolve_context_source(item, base) for item in context_data]
+    return context_data
+
+
+def compile_context(context_data, base=None):
+    """
+    Return a Context for the given JSON-LD context source, compiling it only
+    the first time it is seen. The cached Context is never used directly but
+    copied and rebased on the document being parsed.
+    """
+    source = _resolve_context_source(context_data, base)
+    key = json.dumps(source, sort_keys=True)
+    compiled = _CONTEXT_CACHE.get(key)
+    if compiled is None:
+        compiled = Context(source) if source else Context()
+        _CONTEXT_CACHE[key] = compiled
+    return _rebase(compiled, base)
+
+
+def clear_context_cache():
+    _CONTEXT_CACHE.clear()
+
+
+def _rebase(context, base):
+    rebased = copy.copy(context)
+    rebased._base = None
+    rebased.base = base
+    rebased.doc_base = base
+    return rebased
+
+
+class _JsonStream:
+    """Minimal pull reader over a text file for incremental JSON decoding"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON-LD stream, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # A number may have been cut at the end of the buffer
+            if end == len(self.buf) and self._fill(size):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_document(f, chunk_size=CHUNK_SIZE):
+    """
+    Yield ("context", value), ("item", node) and ("extra", (key, value))
+    events for a JSON-LD document, decoding the top-level @graph lazily.
+    A top-level array is treated as a list of nodes.
+    """
+    stream = _JsonStream(f, chunk_size)
+    first = stream.peek()
+    if first == "[":
+        stream.pos += 1
+        yield from _iter_array(stream)
+        return
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "@graph" and stream.peek() == "[":
+            stream.pos += 1
+            yield from _iter_array(stream)
+        elif key == "@context":
+            yield "context", stream.value()
+        else:
+            yield "extra", (key, stream.value())
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        return
+
+
+def is_streamable(f, chunk_size=CHUNK_SIZE):
+    """
+    True if the document is a top-level array or an object whose first key
+    is @context. JSON key order has no meaning, so in any other object a
+    later @context may still change how the @graph items are read.
+    """
+    stream = _JsonStream(f, chunk_size)
+    first = stream.peek()
+    if first == "[":
+        return True
+    if first != "{":
+        return False
+    stream.pos += 1
+    return stream.peek() == '"' and stream.value() == "@context"
+
+
+def _iter_array(stream):
+    if stream.peek() == "]":
+        stream.pos += 1
+        return
+    while True:
+        yield "item", stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("]")
+        return
+
+
+def parse_jsonld(path, graph=None, context=None, batch_size=BATCH_SIZE):
+    """
+    Parse a JSON-LD file into graph. An optional context (e.g. a known
+    context.jsonld) is applied before the document's own @context, like the
+    context argument of rdflib's JSON-LD parser.
+
+    Unlike rdflib, a streamed top-level object that has its own properties
+    besides @graph is not turned into a named graph: its items go to the
+    default graph.
+    """
+    if graph is None:
+        graph = Graph()
+    path = Path(path)
+    base = path.resolve().as_uri()
+
+    # Mirror rdflib's JsonLDParser, which always works on a conjunctive view
+    sink = graph
+    if not graph.context_aware:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            sink = ConjunctiveGraph(store=graph.store, identifier=graph.identifier)
+    parser = Parser()
+
+    active_context = compile_context(context, base) if context else None
+    pending = []
+    extras = {}
+
+    def flush():
+        parser.parse(pending, active_context or compile_context(None, base), sink)
+        pending.clear()
+
+    with open(path, "r", encoding="utf-8") as f:
+        if not is_streamable(f):
+            f.seek(0)
+            document_context = active_context or compile_context(None, base)
+            parser.parse(json.load(f), document_context, sink)
+            return graph
+        f.seek(0)
+        for event, value in iter_document(f):
+            if event == "context":
+                # Only ever the first key of a streamed object, so no item
+                # is pending yet. JSON-LD processes context arrays in order,
+                # so the known context and the document's own compile (and
+                # cache) as one
+                if context:
+                    value = [context, *(value if isinstance(value, list) else [value])]
+                active_context = compile_context(value, base)
+            elif event == "item":
+                pending.append(value)
+                if len(pending) >= batch_size:
+                    flush()
+            else:
+                key, extra = value
+                extras[key] = extra
+    if extras:
+        pending.append(extras)
+    if pending:
+        flush()
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load JSON-LD files with cached contexts and streamed @graph items"
+    )
+    parser.add_argument("input", nargs="+", help="Paths to JSON-LD files or folders")
+    parser.add_argument("--context", help="JSON-LD context file to apply to every file")
+    parser.add_argument("-o", "--output", help="Serialize the loaded graph to file")
+    parser.add_argument(
+        "--format", default="nt", help="Serialization format for --output"
+    )
+    args = parser.parse_args()
+
+    context = None
+    if args.context:
+        with open(args.context, "r", encoding="utf-8") as f:
+            context = json.load(f).get("@context")
+
+    graph = Graph()
+    for path in args.input:
+        path = Path(path)
+        files = sorted(path.rglob("*.jsonld")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                parse_jsonld(file, graph, context=context)
+            except Exception as e:
+                print(f"⚠️ Failed to parse {file}: {e}")
+
+    print(f"📦 Loaded {len(graph)} triples")
+    if args.output:
+        graph.serialize(args.output, format=args.format)
+        print(f"✅ Graph saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Fast class and property usage scan of N-Triples and N-Quads files. Lines are
+read from a memory-mapped file and their terms matched without building
+rdflib terms or a Graph: only subjects, predicates and the objects of
+rdf:type are kept. Large files can be split into byte ranges scanned by
+several processes.
+"""
+
+import mmap
+import os
+import re
+from collections import defaultdict
+from multiprocessing import Pool
+from pathlib import Path
+
+SCAN_SUFFIXES = {".nt", ".nq"}
+
+RDF_TYPE = b"<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+
+# Ranges smaller than this are not worth a process of their own
+MIN_RANGE_SIZE = 1 << 20
+
+# Subject, predicate and (unless a literal) object of a line. Whitespace
+# between terms is optional, so IRIs are read up to their closing ">"; a
+# blank node label cannot end with ".", which is the end of the statement.
+_TRIPLE = re.compile(
+    rb'[ \t]*(<[^>]*>|_:[^\s<>"]+)[ \t]*(<[^>]*>)[ \t]*(<[^>]*>|_:[^\s<>"]+)?'
+)
+
+_UCHAR = re.compile(r"\\u([0-9A-Fa-f]{4})|\\U([0-9A-Fa-f]{8})")
+
+
+def is_scannable(file_path):
+    return Path(file_path).suffix.lower() in SCAN_SUFFIXES
+
+
+def decode_term(term):
+    """IRI (or blank node) bytes as the string rdflib would give for the term"""
+    if term.startswith(b"<"):
+        value = term[1:-1].decode("utf-8")
+        if "\\" in value:
+            value = _UCHAR.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)), value)
+        return value
+    return term.decode("utf-8")
+
+
+def split_ranges(file_path, parts):
+    """Split a file into at most parts byte ranges that end on a line boundary"""
+    size = os.path.getsize(file_path)
+    parts = max(1, min(parts, size // MIN_RANGE_SIZE))
+    if size == 0:
+        return []
+    if parts == 1:
+        return [(0, size)]
+    bounds = [0]
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(1, parts):
+                newline = mm.find(b"\n", max(bounds[-1], size * i // parts))
+                if newline == -1:
+                    break
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def scan_range(file_path, start, end, file_key=0):
+    """
+    Scan the lines of file_path in [start, end). Returns the predicates and
+    the rdf:type objects of each subject, as raw term bytes. Blank node
+    labels are only meaningful within one file, so they are qualified with
+    file_key.
+    """
+    predicates = defaultdict(set)
+    types = defaultdict(set)
+    interned = {}
+    bnode_prefix = b"_:%d." % file_key
+    lines = 0
+
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(start)
+            readline = mm.readline
+            match = _TRIPLE.match
+            while mm.tell() < end:
+                triple = match(readline())
+                if triple is None:
+                    continue
+                subject, predicate, obj = triple.groups()
+                if subject.startswith(b"_:"):
+                    subject = bnode_prefix + subject[2:].rstrip(b".")
+                lines += 1
+                if predicate == RDF_TYPE:
+                    if obj is None:
+                        continue
+                    if obj.startswith(b"_:"):
+                        obj = obj.rstrip(b".")
+                    types[subject].add(interned.setdefault(obj, obj))
+                else:
+                    predicates[subject].add(interned.setdefault(predicate, predicate))
+
+    return dict(predicates), dict(types), lines
+
+
+def _scan_task(task):
+    return scan_range(*task)
+
+
+def scan_files(files, processes=1):
+    """
+    Scan files and return (classes, properties, triples): the distinct
+    rdf:type objects that are IRIs, and the distinct (property, type)
+    combinations of all non-rdf:type triples, with None as the type of
+    untyped subjects. This is what get_all_classes and get_all_properties
+    compute, but subjects are joined to their types across all files
+    without loading a Graph.
+    """
+    tasks = [
+        (str(file), start, end, file_key)
+        for file_key, file in enumerate(files)
+        for start, end in split_ranges(file, processes)
+    ]
+    if processes > 1 and len(tasks) > 1:
+        with Pool(processes) as pool:
+            results = pool.map(_scan_task, tasks)
+    else:
+        results = map(_scan_task, tasks)
+
+    predicates = defaultdict(set)
+    types = defaultdict(set)
+    triples = 0
+    for partial_predicates, partial_types, lines in results:
+        for subject, values in partial_predicates.items():
+            predicates[subject] |= values
+        for subject, values in partial_types.items():
+            types[subject] |= values
+        triples += lines
+
+    classes = {
+        decode_term(cls)
+        for values in types.values()
+        for cls in values
+        if cls.startswith(b"<")
+    }
+    combinations = set()
+    for subject, values in predicates.items():
+        subject_types = types.get(subject) or (None,)
+        for predicate in values:
+            for subject_type in subject_types:
+                combinations.add((predicate, subject_type))
+    properties = {
+        (decode_term(predicate), decode_term(subject_type) if subject_type else None)
+        for predicate, subject_type in combinations
+    }
+    return classes, properties, triples
+
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation for the extraction and coverage scripts: named
+spans timing each stage, counters for triples, rows and entities, and the
+peak RSS of the process. Metrics are written as JSON or OpenMetrics text so
+nightly runs can be tracked by monitoring.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = "dcat_ap_lu"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Metrics:
+    """
+    Collects stage timings and counters. A span entered several times (e.g.
+    once per file) accumulates its total time and number of calls.
+    """
+
+    def __init__(self, script=None):
+        self.script = script
+        self.spans = {}
+        self.counters = Counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds, calls=1):
+        """
+        Add time measured by the caller, e.g. perf_counter deltas summed
+        over the rows of one streaming pass
+        """
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + calls)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def reset(self, script=None):
+        self.script = script
+        self.spans.clear()
+        self.counters.clear()
+
+    def to_dict(self):
+        return {
+            "script": self.script,
+            "timestamp": time.time(),
+            "spans": {
+                name: {"seconds": round(total, 6), "calls": calls}
+                for name, (total, calls) in self.spans.items()
+            },
+            "counters": dict(self.counters),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def to_openmetrics(self):
+        labels = f'script="{self.script}"' if self.script else ""
+        sep = "," if labels else ""
+        stage = f"{METRIC_PREFIX}_stage_seconds"
+        items = f"{METRIC_PREFIX}_items"
+        rss = f"{METRIC_PREFIX}_peak_rss_bytes"
+
+        lines = [
+            f"# TYPE {stage} summary",
+            f"# UNIT {stage} seconds",
+            f"# HELP {stage} Time spent in each stage.",
+        ]
+        for name, (total, calls) in self.spans.items():
+            lines.append(f'{stage}_sum{{{labels}{sep}stage="{name}"}} {total:.6f}')
+            lines.append(f'{stage}_count{{{labels}{sep}stage="{name}"}} {calls}')
+        lines += [
+            f"# TYPE {items} counter",
+            f"# HELP {items} Number of triples, rows and entities processed.",
+        ]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{items}_total{{{labels}{sep}name="{name}"}} {value}')
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines += [
+                f"# TYPE {rss} gauge",
+                f"# UNIT {rss} bytes",
+                f"# HELP {rss} Peak resident set size of the process.",
+                f"{rss}{{{labels}}} {peak}",
+            ]
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def export(self, output_file):
+        """JSON for a .json file, OpenMetrics text for anything else"""
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            if output_file.suffix.lower() == ".json":
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.to_openmetrics())
+        # stdout carries the entity lists, so report on stderr
+        print(f"✅ Metrics saved to {output_file}", file=sys.stderr)
+
+
+# Shared by the functions of the instrumented scripts
+metrics = Metrics()
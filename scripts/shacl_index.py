@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Compiles a SHACL shapes file into a dispatch index: for each target class,
+the NodeShapes that apply to it and the (path, constraints) of their
+PropertyShapes. The index is saved as JSON next to the shapes file by
+make shacl-index and reused, as long as the shapes file is unchanged, by
+the validators (to only run the shapes of the classes present in the
+data), by extract_entity_usage.py --shacl and by the coverage tooling, so
+none of them walks the shapes graph again. They compile a stale index in
+memory instead, without saving it.
+"""
+
+import argparse
+import hashlib
+import json
+from collections import namedtuple
+from pathlib import Path
+from types import MappingProxyType
+
+from rdflib import RDF, RDFS, BNode, Graph, Literal, URIRef
+from rdflib.collection import Collection
+from rdflib.namespace import SH
+
+from extract_entity_usage import get_shacl_classes, get_shacl_properties, to_prefixed
+
+# Bump when the layout of the index changes
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+
+# Documentation of a shape, not constraints
+ANNOTATION_PREDICATES = {SH.path, SH.property, SH.name, SH.description, SH.order, SH.group}
+
+# Targets other than sh:targetClass cannot be dispatched by class
+OTHER_TARGETS = {SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf, SH.target}
+
+# pyshacl options that add triples to the data before validating it, so the
+# shapes to run cannot be picked from the classes of the data alone
+EXPANDING_OPTIONS = ("inference", "ont_graph", "advanced")
+
+ClassShapes = namedtuple("ClassShapes", ["shapes", "properties"])
+PropertyConstraints = namedtuple("PropertyConstraints", ["shape", "path", "constraints"])
+ShapeIndex = namedtuple(
+    "ShapeIndex", ["namespaces", "classes", "unattached", "dispatchable"]
+)
+
+
+def index_path(shapes_file):
+    """The index of shapes.ttl is shapes.ttl.index.json"""
+    shapes_file = Path(shapes_file)
+    return shapes_file.with_name(shapes_file.name + INDEX_SUFFIX)
+
+
+def file_hash(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def term_to_json(graph, term):
+    """IRIs as strings, literals as Python values, lists and nodes nested"""
+    if isinstance(term, Literal):
+        value = term.toPython()
+        return value if isinstance(value, (str, int, float, bool)) else str(term)
+    if isinstance(term, BNode):
+        if graph.value(term, RDF.first) is not None or term == RDF.nil:
+            return [term_to_json(graph, item) for item in Collection(graph, term)]
+        return constraints_of(graph, term)
+    return str(term)
+
+
+def constraints_of(graph, shape):
+    """SHACL parameters of a shape, keyed by local name (e.g. minCount)"""
+    values = {}
+    for predicate, obj in sorted(graph.predicate_objects(shape)):
+        if not str(predicate).startswith(str(SH)) or predicate in ANNOTATION_PREDICATES:
+            continue
+        key = str(predicate)[len(str(SH)) :]
+        values.setdefault(key, []).append(term_to_json(graph, obj))
+    # A repeated parameter (e.g. several sh:sparql) keeps all its values
+    return {key: value[0] if len(value) == 1 else value for key, value in values.items()}
+
+
+def property_entry(graph, shape):
+    return {
+        "shape": str(shape),
+        "path": term_to_json(graph, graph.value(shape, SH.path)),
+        "constraints": constraints_of(graph, shape),
+    }
+
+
+def is_dispatchable(shapes_graph):
+    """
+    Whether every shape with a target is a NodeShape targeting classes only,
+    i.e. the index covers every shape pyshacl would run
+    """
+    node_shapes = set(shapes_graph.subjects(RDF.type, SH.NodeShape))
+    if set(shapes_graph.subjects(SH.targetClass, None)) - node_shapes:
+        return False
+    if any(next(shapes_graph.subjects(target, None), None) for target in OTHER_TARGETS):
+        return False
+    # Shapes that are also classes implicitly target their instances
+    return not any(
+        (shape, RDF.type, RDFS.Class) in shapes_graph
+        for shape_type in (SH.NodeShape, SH.PropertyShape)
+        for shape in shapes_graph.subjects(RDF.type, shape_type)
+    )
+
+
+def compile_index(shapes_graph, shapes_file=None):
+    """Build the JSON-serialisable index of a shapes graph"""
+    classes = {}
+    attached = set()
+    for shape in sorted(shapes_graph.subjects(RDF.type, SH.NodeShape)):
+        property_shapes = sorted(shapes_graph.objects(shape, SH.property))
+        attached.update(property_shapes)
+        for target_class in sorted(shapes_graph.objects(shape, SH.targetClass)):
+            entry = classes.setdefault(
+                str(target_class), {"shapes": [], "properties": []}
+            )
+            entry["shapes"].append(str(shape))
+            entry["properties"].extend(
+                property_entry(shapes_graph, property_shape)
+                for property_shape in property_shapes
+                if shapes_graph.value(property_shape, SH.path) is not None
+            )
+
+    # Computing the qnames like extract_entity_usage.py --shacl --prefixed
+    # binds the generated nsN prefixes in the same order, so the saved
+    # namespaces give the same names without the shapes graph
+    get_shacl_classes(shapes_graph, use_prefixes=True)
+    get_shacl_properties(shapes_graph, use_prefixes=True)
+
+    unattached = [
+        property_entry(shapes_graph, shape)
+        for shape in sorted(shapes_graph.subjects(RDF.type, SH.PropertyShape))
+        if shape not in attached and shapes_graph.value(shape, SH.path) is not None
+    ]
+    return {
+        "version": INDEX_VERSION,
+        "shapes_file": Path(shapes_file).name if shapes_file else None,
+        "sha256": file_hash(shapes_file) if shapes_file else None,
+        "dispatchable": is_dispatchable(shapes_graph),
+        "namespaces": [
+            [prefix, str(namespace)] for prefix, namespace in shapes_graph.namespaces()
+        ],
+        "classes": classes,
+        "unattached": unattached,
+    }
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _property_constraints(entry):
+    return PropertyConstraints(
+        entry["shape"], entry["path"], _freeze(entry["constraints"])
+    )
+
+
+def freeze_index(data):
+    """Read-only view of a compiled index"""
+    return ShapeIndex(
+        namespaces=tuple(tuple(pair) for pair in data["namespaces"]),
+        classes=MappingProxyType(
+            {
+                cls: ClassShapes(
+                    tuple(entry["shapes"]),
+                    tuple(_property_constraints(p) for p in entry["properties"]),
+                )
+                for cls, entry in data["classes"].items()
+            }
+        ),
+        unattached=tuple(_property_constraints(p) for p in data["unattached"]),
+        dispatchable=data["dispatchable"],
+    )
+
+
+def save_index(data, output_file):
+    output_file = Path(output_file)
+    # Replaced in one step, so validators never read a partial index
+    tmp_file = output_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    tmp_file.replace(output_file)
+
+
+def build_index(shapes_file, shapes_graph=None):
+    """Compile the index of a shapes file and save it next to it"""
+    if shapes_graph is None:
+        shapes_graph = Graph().parse(shapes_file)
+    data = compile_index(shapes_graph, shapes_file)
+    save_index(data, index_path(shapes_file))
+    return data
+
+
+def load_index(shapes_file, shapes_graph=None):
+    """
+    The index of a shapes file, read from its saved copy if that was built
+    from the same file content, otherwise compiled in memory. Only
+    build_index (make shacl-index) writes the saved copy.
+    """
+    saved = index_path(shapes_file)
+    if saved.exists():
+        with open(saved, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION and data.get("sha256") == file_hash(
+            shapes_file
+        ):
+            return freeze_index(data)
+    if shapes_graph is None:
+        shapes_graph = Graph().parse(shapes_file)
+    return freeze_index(compile_index(shapes_graph, shapes_file))
+
+
+def namespace_graph(index):
+    """An empty graph with the prefixes of the shapes file, for qnames"""
+    graph = Graph(bind_namespaces="none")
+    for prefix, namespace in index.namespaces:
+        graph.bind(prefix, namespace, override=True, replace=True)
+    return graph
+
+
+def index_entities(index, use_prefixes=False, filter_entities=None, property_parents=None):
+    """
+    Classes and (property, parent class) combinations of the shapes, as
+    get_shacl_classes and get_shacl_properties return them.
+    """
+    graph = namespace_graph(index)
+
+    def name(uri):
+        return to_prefixed(graph, uri) if use_prefixes else uri
+
+    classes = set()
+    properties = set()
+    for cls, entry in index.classes.items():
+        class_name = name(cls)
+        if filter_entities is None or class_name in filter_entities:
+            classes.add(class_name)
+        for prop in entry.properties:
+            if not isinstance(prop.path, str):
+                continue
+            prop_name = name(prop.path)
+            if filter_entities is not None and prop_name not in filter_entities:
+                continue
+            if property_parents is not None and prop_name in property_parents:
+                if class_name not in property_parents[prop_name]:
+                    continue
+            properties.add((prop_name, class_name))
+
+    with_parent = {prop for prop, _ in properties}
+    for prop in index.unattached:
+        if not isinstance(prop.path, str):
+            continue
+        prop_name = name(prop.path)
+        if filter_entities is not None and prop_name not in filter_entities:
+            continue
+        if property_parents is not None and prop_name in property_parents:
+            continue
+        if prop_name not in with_parent:
+            properties.add((prop_name, None))
+
+    return sorted(classes), sorted(properties, key=lambda r: (r[0], r[1] or ""))
+
+
+def dispatch_shapes(index, data_graph):
+    """
+    NodeShapes (and their PropertyShapes) targeting the classes of the data,
+    including classes the data declares as rdfs:subClassOf a target class.
+    None if the shapes cannot be dispatched by class.
+    """
+    if not index.dispatchable:
+        return None
+    types = set(data_graph.objects(None, RDF.type))
+    for cls in list(types):
+        types.update(data_graph.transitive_objects(cls, RDFS.subClassOf))
+    shapes = []
+    for cls in types:
+        entry = index.classes.get(str(cls))
+        if entry is not None:
+            # pyshacl only runs the property shapes that are listed too
+            shapes.extend(entry.shapes)
+            shapes.extend(prop.shape for prop in entry.properties)
+    return sorted(set(shapes))
+
+
+def validate_dispatched(data_graph, shacl_graph, index, **kwargs):
+    """
+    pyshacl validate, running only the NodeShapes that have focus nodes.
+    With inference, an ontology graph or SHACL rules, the data gains types
+    the dispatch cannot see, so every shape is run.
+    """
+    # Imported here so that reading the index does not load pyshacl
+    from pyshacl import validate
+
+    expanded = any(
+        kwargs.get(option) not in (None, False, "none") for option in EXPANDING_OPTIONS
+    )
+    shapes = None if expanded else dispatch_shapes(index, data_graph)
+    if shapes:
+        kwargs["use_shapes"] = [URIRef(shape) for shape in shapes]
+    return validate(data_graph, shacl_graph=shacl_graph, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compile a SHACL shapes file into a class dispatch index"
+    )
+    parser.add_argument("shapes_file", help="Path to the SHACL shapes file")
+    args = parser.parse_args()
+
+    data = build_index(args.shapes_file)
+    properties = sum(len(entry["properties"]) for entry in data["classes"].values())
+    print(
+        f"📦 Indexed {len(data['classes'])} classes with {properties} property "
+        f"constraints ({len(data['unattached'])} unattached)"
+    )
+    print(f"✅ Index saved to {index_path(args.shapes_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,13 @@ shapes file.
 """
 
 import argparse
-from pyshacl import validate
 from rdflib import Graph
 import glob
 
+from shacl_index import load_index, validate_dispatched
+
+DEFAULT_SHAPES_FILE = "implementation/dcat_ap_lu/shacl_shapes/dcat_ap_lu_CM_shapes.ttl"
+
 
 def find_test_file(search_str, test_type="valid"):
     """Search for a test file matching the pattern in tests/test_data"""
@@ -54,7 +57,7 @@ def parse_arguments():
         "-s",
         "--shapes",
         type=str,
-        default="implementation/dcat_ap_lu/shacl_shapes/dcat_ap_lu_CM_shapes.ttl",
+        default=DEFAULT_SHAPES_FILE,
         help="Path to the SHACL shapes file",
     )
     return parser.parse_args()
@@ -76,7 +79,8 @@ def main():
 
     input_data = Graph().parse(input_path)
     shacl_data = Graph().parse(args.shapes)
-    _, _, text = validate(input_data, shacl_graph=shacl_data)
+    index = load_index(args.shapes, shacl_data)
+    _, _, text = validate_dispatched(input_data, shacl_data, index)
     print(text)
 
 
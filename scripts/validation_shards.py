@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+Sharded SHACL validation for corpora too large for a single machine. The
+corpus is split into shards balanced by triple count and written to a
+manifest in a shared work directory; workers on any node claim and validate
+shards independently; a merge step retries failed shards and combines the
+per-shard results into one deterministic report and coverage summary.
+
+    python scripts/validation_shards.py plan <inputs...> -w <work_dir> -n 8
+    python scripts/validation_shards.py work -w <work_dir> [--processes 4]
+    python scripts/validation_shards.py merge -w <work_dir> --json report.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import time
+import traceback
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+
+from rdflib import RDF, BNode, Graph, Literal, URIRef
+from rdflib.namespace import DCAT, DCTERMS, SH
+
+from aggregate_violations import (
+    export_to_csv,
+    find_publisher,
+    format_publisher,
+    iter_data_files,
+)
+from check_entity_coverage import compare_lists, entity_lines, print_report
+from extract_entity_usage import get_all_classes, get_all_properties, parse_file
+from shacl_index import index_entities, load_index, validate_dispatched
+from validation_runner import DEFAULT_SHAPES_FILE
+
+MANIFEST_NAME = "manifest.json"
+UNITS_DIR = "units"
+LOCKS_DIR = "locks"
+RESULTS_DIR = "results"
+
+# A lock older than this is taken to be left by a dead worker
+LOCK_TIMEOUT = 2 * 60 * 60
+
+REPORT_FIELDS = [
+    "focus",
+    "path",
+    "value",
+    "shape",
+    "component",
+    "severity",
+    "message",
+    "publisher",
+]
+# The fields that identify a result, whichever unit it was found in
+DEDUPLICATION_FIELDS = ["focus", "shape", "component", "path", "value"]
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+
+def dataset_closures(graph):
+    """
+    Split a graph into one unit per dcat:Dataset, holding every triple
+    reachable from it without crossing into another Dataset or Catalog, plus
+    one unit with the remaining triples. Units also carry context they do
+    not own, so that they validate as they would in the whole graph:
+
+    - the rdf:type of every node they refer to but do not describe, so
+      sh:class constraints still hold in isolation;
+    - the links from the Catalogs that list a Dataset, with the
+      dct:publisher of those Catalogs, so find_publisher still reaches it.
+
+    Those foreign nodes are returned alongside the triples so that the
+    targets they would otherwise trigger can be ignored, and so are the
+    nodes the unit describes.
+    """
+    datasets = sorted(set(graph.subjects(RDF.type, DCAT.Dataset)), key=str)
+    catalogs = set(graph.subjects(RDF.type, DCAT.Catalog))
+    boundary = set(datasets) | catalogs
+
+    units = []
+    assigned = set()
+    for dataset in datasets:
+        triples = set()
+        stack = [dataset]
+        seen = {dataset}
+        while stack:
+            node = stack.pop()
+            for triple in graph.triples((node, None, None)):
+                triples.add(triple)
+                obj = triple[2]
+                if isinstance(obj, (URIRef, BNode)) and obj not in seen:
+                    seen.add(obj)
+                    if obj not in boundary:
+                        stack.append(obj)
+        context = set()
+        for catalog, predicate in graph.subject_predicates(dataset):
+            if catalog in catalogs:
+                context.add((catalog, predicate, dataset))
+                context.update(graph.triples((catalog, DCTERMS.publisher, None)))
+        units.append((triples, context))
+        assigned |= triples
+
+    rest = {triple for triple in graph if triple not in assigned}
+    if rest:
+        units.append((rest, set()))
+
+    closures = []
+    for triples, context in units:
+        owned = {s for s, _, _ in triples}
+        foreign = {s for s, _, _ in context if s not in owned}
+        foreign.update(
+            o
+            for _, _, o in triples | context
+            if isinstance(o, (URIRef, BNode)) and o not in owned
+        )
+        triples |= context
+        for node in foreign:
+            triples.update(graph.triples((node, RDF.type, None)))
+        closures.append((triples, foreign, owned))
+    return closures
+
+
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def count_units(paths):
+    """Parse every input file once and return its (path, triples) unit"""
+    units = []
+    for file in iter_data_files(paths):
+        try:
+            graph = parse_file(Graph(), file)
+        except Exception as e:
+            print(f"⚠️ Failed to parse {file}: {e}")
+            continue
+        units.append({"path": str(file.resolve()), "triples": len(graph)})
+    return units
+
+
+def split_large_units(units, work_dir, target_triples):
+    """
+    Replace the units larger than target_triples by their dataset closures,
+    written under the work directory. Turtle keeps the prefixes of the source
+    file, which the prefixed entity usage of the workers relies on.
+    """
+    units_dir = Path(work_dir) / UNITS_DIR
+    split_units = []
+    for unit in units:
+        if unit["triples"] <= target_triples:
+            split_units.append(unit)
+            continue
+
+        file = Path(unit["path"])
+        graph = parse_file(Graph(), file)
+        closures = dataset_closures(graph)
+        print(
+            f"✂️ Splitting {file} ({unit['triples']} triples) into {len(closures)} units"
+        )
+        units_dir.mkdir(parents=True, exist_ok=True)
+        prefix = f"{file.stem}-{file_digest(file)[:12]}"
+        for i, (closure, foreign, owned) in enumerate(closures):
+            unit_graph = Graph()
+            for ns_prefix, namespace in graph.namespaces():
+                unit_graph.bind(ns_prefix, namespace, override=True)
+            for triple in closure:
+                unit_graph.add(triple)
+            unit_file = units_dir / f"{prefix}-{i:04d}.ttl"
+            unit_graph.serialize(unit_file, format="turtle", encoding="utf-8")
+            split_units.append(
+                {
+                    "path": str(unit_file.resolve()),
+                    "triples": len(unit_graph),
+                    # As the report rows name them, blank nodes included
+                    "foreign": sorted(format_node(unit_graph, node) for node in foreign),
+                    "publishers": unit_publishers(graph, unit_graph, owned),
+                }
+            )
+    return split_units
+
+
+def unit_publishers(graph, unit_graph, nodes):
+    """
+    The publisher of each node in the whole graph, for the nodes whose unit
+    alone gives another one (e.g. a distribution shared by two datasets
+    only sees the publisher of its own dataset), keyed like report rows
+    """
+    publishers = {}
+    for node in nodes:
+        publisher = format_publisher(graph, find_publisher(graph, node))
+        if publisher != format_publisher(unit_graph, find_publisher(unit_graph, node)):
+            publishers[format_node(unit_graph, node)] = publisher
+    return dict(sorted(publishers.items()))
+
+
+def balance_units(units, shard_count):
+    """Greedy largest-first assignment of units to the lightest shard"""
+    shards = [{"units": [], "triples": 0} for _ in range(shard_count)]
+    for unit in sorted(units, key=lambda unit: (-unit["triples"], unit["path"])):
+        shard = min(shards, key=lambda s: s["triples"])
+        shard["units"].append(unit)
+        shard["triples"] += unit["triples"]
+    shards = [shard for shard in shards if shard["units"]]
+    for i, shard in enumerate(shards):
+        shard["units"].sort(key=lambda unit: unit["path"])
+    return [
+        {"id": f"shard-{i:04d}", "triples": s["triples"], "units": s["units"]}
+        for i, s in enumerate(shards)
+    ]
+
+
+def plan_shards(paths, work_dir, shard_count, shapes_file, split_large=True):
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    units = count_units(paths)
+    if split_large and units:
+        # Anything bigger than an average shard would leave the others idle
+        target = max(1, sum(unit["triples"] for unit in units) // shard_count)
+        units = split_large_units(units, work_dir, target)
+
+    manifest = {
+        "shapes": str(Path(shapes_file).resolve()),
+        "shards": balance_units(units, shard_count),
+    }
+    write_json_atomic(work_dir / MANIFEST_NAME, manifest)
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+
+def write_json_atomic(output_file, data):
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_file, output_file)
+
+
+def load_manifest(work_dir):
+    with open(Path(work_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def result_file(work_dir, shard_id):
+    return Path(work_dir) / RESULTS_DIR / f"{shard_id}.json"
+
+
+def failure_file(work_dir, shard_id):
+    return Path(work_dir) / RESULTS_DIR / f"{shard_id}.failed"
+
+
+def lock_file(work_dir, shard_id):
+    return Path(work_dir) / LOCKS_DIR / f"{shard_id}.lock"
+
+
+def _lock_owner():
+    return f"{socket.gethostname()} {os.getpid()}"
+
+
+def claim_shard(work_dir, shard_id):
+    """Take the lock of a shard; only one worker across all nodes succeeds"""
+    lock = lock_file(work_dir, shard_id)
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{_lock_owner()} {time.time()}\n")
+    return True
+
+
+def lock_age(work_dir, shard_id):
+    """Seconds since the lock of a shard was taken, or None if it is free"""
+    try:
+        with open(lock_file(work_dir, shard_id), "r", encoding="utf-8") as f:
+            taken = float(f.read().split()[-1])
+    except FileNotFoundError:
+        return None
+    except (IndexError, ValueError):
+        # Being written, or not ours to read: treat as just taken
+        return 0.0
+    return time.time() - taken
+
+
+def release_shard(work_dir, shard_id, force=False):
+    """
+    Remove the lock of a shard if this process holds it. A lock that was
+    broken and taken over by the merge step is left to its new owner.
+    """
+    lock = lock_file(work_dir, shard_id)
+    try:
+        if not force:
+            with open(lock, "r", encoding="utf-8") as f:
+                if not f.read().startswith(_lock_owner() + " "):
+                    return
+        os.remove(lock)
+    except FileNotFoundError:
+        pass
+
+
+def format_node(graph, node):
+    """
+    Blank node labels differ between parses and shards, so they are replaced
+    by a digest of their outgoing triples to keep merged reports stable.
+    """
+    if node is None:
+        return ""
+    if isinstance(node, BNode):
+        digest = hashlib.sha1()
+        for p, o in sorted(
+            (str(p), o.n3() if not isinstance(o, BNode) else "_:")
+            for p, o in graph.predicate_objects(node)
+        ):
+            digest.update(f"{p} {o}\n".encode("utf-8"))
+        return f"_:{digest.hexdigest()[:16]}"
+    if isinstance(node, Literal):
+        return node.n3()
+    return str(node)
+
+
+def report_rows(report_graph, data_graph, publishers=None):
+    """
+    One row per validation result. publishers overrides the publisher of
+    focus nodes that were split away from the rest of their graph.
+    """
+    rows = []
+    for result in report_graph.subjects(RDF.type, SH.ValidationResult):
+
+        def value(predicate, graph=report_graph):
+            return format_node(graph, report_graph.value(result, predicate))
+
+        focus = value(SH.focusNode, data_graph)
+        if publishers and focus in publishers:
+            publisher = publishers[focus]
+        else:
+            node = report_graph.value(result, SH.focusNode)
+            publisher = format_publisher(
+                data_graph,
+                find_publisher(data_graph, node) if node is not None else None,
+            )
+        rows.append(
+            {
+                "focus": focus,
+                "path": value(SH.resultPath),
+                "value": value(SH.value, data_graph),
+                "shape": value(SH.sourceShape),
+                "component": value(SH.sourceConstraintComponent),
+                "severity": value(SH.resultSeverity),
+                "message": str(report_graph.value(result, SH.resultMessage) or ""),
+                "publisher": publisher,
+            }
+        )
+    return rows
+
+
+def validate_shard(shard, shacl_graph, index):
+    """
+    Validate each unit of a shard on its own, like aggregate_violations.py
+    does per file, dropping results about foreign nodes of dataset closures.
+    """
+    rows = []
+    classes = set()
+    properties = set()
+    triples = 0
+    for unit in shard["units"]:
+        data_graph = parse_file(Graph(), unit["path"])
+        _, report_graph, _ = validate_dispatched(data_graph, shacl_graph, index)
+        foreign = set(unit.get("foreign", []))
+        rows.extend(
+            row
+            for row in report_rows(report_graph, data_graph, unit.get("publishers"))
+            if row["focus"] not in foreign
+        )
+        classes.update(get_all_classes(data_graph, use_prefixes=True))
+        properties.update(get_all_properties(data_graph, use_prefixes=True))
+        triples += len(data_graph)
+    return {
+        "id": shard["id"],
+        "conforms": not rows,
+        "triples": triples,
+        "results": rows,
+        "classes": sorted(classes),
+        "properties": [
+            [prop, parent]
+            for prop, parent in sorted(properties, key=lambda p: (p[0], p[1] or ""))
+        ],
+    }
+
+
+def run_shard(work_dir, shard, shacl_graph, index):
+    """Validate one shard, recording either its result or its failure"""
+    (Path(work_dir) / RESULTS_DIR).mkdir(parents=True, exist_ok=True)
+    try:
+        result = validate_shard(shard, shacl_graph, index)
+    except Exception as e:
+        write_json_atomic(
+            failure_file(work_dir, shard["id"]),
+            {"id": shard["id"], "error": str(e), "traceback": traceback.format_exc()},
+        )
+        print(f"❌ {shard['id']} failed: {e}")
+        return False
+    write_json_atomic(result_file(work_dir, shard["id"]), result)
+    try:
+        os.remove(failure_file(work_dir, shard["id"]))
+    except FileNotFoundError:
+        pass
+    print(f"✅ {shard['id']} validated ({result['triples']} triples)")
+    return True
+
+
+def run_worker(work_dir, shard_ids=None):
+    """Claim and validate every pending shard of the manifest"""
+    manifest = load_manifest(work_dir)
+    shacl_graph = Graph().parse(manifest["shapes"])
+    index = load_index(manifest["shapes"], shacl_graph)
+    done = 0
+    for shard in manifest["shards"]:
+        if shard_ids and shard["id"] not in shard_ids:
+            continue
+        # Failed shards are left to the retry of the merge step
+        if result_file(work_dir, shard["id"]).exists():
+            continue
+        if failure_file(work_dir, shard["id"]).exists():
+            continue
+        if not claim_shard(work_dir, shard["id"]):
+            continue
+        try:
+            done += run_shard(work_dir, shard, shacl_graph, index)
+        finally:
+            release_shard(work_dir, shard["id"])
+    return done
+
+
+# ---------------------------------------------------------------------------
+# Merge
+# ---------------------------------------------------------------------------
+
+
+def retry_shards(work_dir, manifest, retries, lock_timeout=LOCK_TIMEOUT):
+    """
+    Re-run shards without a result. A shard still locked by a worker is
+    left alone unless its lock is older than lock_timeout, which is taken
+    to mean the worker died.
+    """
+    shacl_graph = None
+    for attempt in range(retries):
+        missing = [
+            shard
+            for shard in manifest["shards"]
+            if not result_file(work_dir, shard["id"]).exists()
+        ]
+        if not missing:
+            return []
+        if shacl_graph is None:
+            shacl_graph = Graph().parse(manifest["shapes"])
+            index = load_index(manifest["shapes"], shacl_graph)
+        print(f"🔁 Retrying {len(missing)} shard(s), attempt {attempt + 1}/{retries}")
+        for shard in missing:
+            age = lock_age(work_dir, shard["id"])
+            if age is not None and age < lock_timeout:
+                print(f"⏳ {shard['id']} is locked by a running worker, skipping")
+                continue
+            if age is not None:
+                print(f"⚠️ Breaking the {age:.0f}s old lock of {shard['id']}")
+                release_shard(work_dir, shard["id"], force=True)
+            if not claim_shard(work_dir, shard["id"]):
+                continue
+            try:
+                run_shard(work_dir, shard, shacl_graph, index)
+            finally:
+                release_shard(work_dir, shard["id"])
+    return [
+        shard["id"]
+        for shard in manifest["shards"]
+        if not result_file(work_dir, shard["id"]).exists()
+    ]
+
+
+def merge_results(work_dir, manifest):
+    """
+    Combine per-shard results. Rows are de-duplicated by focus node, shape,
+    component, path and value, as nodes shared by several dataset closures
+    are validated in each of them, and sorted so the merged report does not
+    depend on shard order or count.
+    """
+    conforms = True
+    rows = {}
+    classes = set()
+    properties = set()
+    triples = 0
+    for shard in manifest["shards"]:
+        with open(result_file(work_dir, shard["id"]), "r", encoding="utf-8") as f:
+            result = json.load(f)
+        conforms = conforms and result["conforms"]
+        triples += result["triples"]
+        for row in result["results"]:
+            key = tuple(row[field] for field in DEDUPLICATION_FIELDS)
+            values = tuple(row[field] for field in REPORT_FIELDS)
+            rows[key] = min(rows.get(key, values), values)
+        classes.update(result["classes"])
+        properties.update((prop, parent) for prop, parent in result["properties"])
+    results = [dict(zip(REPORT_FIELDS, row)) for row in sorted(rows.values())]
+    counts = Counter(
+        (row["shape"], row["component"], row["path"], row["publisher"])
+        for row in results
+    )
+    return {
+        "conforms": conforms,
+        "shards": len(manifest["shards"]),
+        "triples": triples,
+        "results": results,
+        "counts": counts,
+        "classes": sorted(classes),
+        "properties": sorted(properties, key=lambda p: (p[0], p[1] or "")),
+    }
+
+
+def coverage_summary(merged, shapes_file):
+    shacl_entities = entity_lines(
+        *index_entities(load_index(shapes_file), use_prefixes=True)
+    )
+    data_entities = entity_lines(merged["classes"], merged["properties"])
+    return compare_lists(shacl_entities, set(data_entities))
+
+
+def export_report(merged, coverage, output_file):
+    data = {
+        "conforms": merged["conforms"],
+        "shards": merged["shards"],
+        "triples": merged["triples"],
+        "total": len(merged["results"]),
+        "results": merged["results"],
+        "coverage": {
+            "defined": coverage["defined"],
+            "used": coverage["used"],
+            "coverage_percent": coverage["coverage_percent"],
+        },
+    }
+    write_json_atomic(output_file, data)
+    print(f"✅ JSON saved to {output_file}")
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def _work_process(args):
+    work_dir, shard_ids = args
+    return run_worker(work_dir, shard_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded SHACL validation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Split inputs into shards")
+    plan_parser.add_argument("input", nargs="+", help="Paths to RDF files or folders")
+    plan_parser.add_argument("-w", "--work-dir", required=True, help="Shared work directory")
+    plan_parser.add_argument("-n", "--shards", type=int, default=4, help="Number of shards")
+    plan_parser.add_argument(
+        "-s", "--shapes", default=DEFAULT_SHAPES_FILE, help="Path to the SHACL shapes file"
+    )
+    plan_parser.add_argument(
+        "--no-split",
+        action="store_true",
+        help="Never split large files into dataset closures",
+    )
+
+    work_parser = subparsers.add_parser("work", help="Validate pending shards")
+    work_parser.add_argument("-w", "--work-dir", required=True, help="Shared work directory")
+    work_parser.add_argument("--shard", nargs="+", help="Only validate these shard ids")
+    work_parser.add_argument(
+        "--processes", type=int, default=1, help="Number of local worker processes"
+    )
+
+    merge_parser = subparsers.add_parser("merge", help="Merge shard results")
+    merge_parser.add_argument("-w", "--work-dir", required=True, help="Shared work directory")
+    merge_parser.add_argument(
+        "--retries", type=int, default=1, help="Attempts for shards without result"
+    )
+    merge_parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=LOCK_TIMEOUT,
+        help="Seconds after which the lock of a shard without result is broken",
+    )
+    merge_parser.add_argument("--csv", help="Export the violation summary to CSV file")
+    merge_parser.add_argument("--json", help="Export the merged report to JSON file")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        manifest = plan_shards(
+            args.input, args.work_dir, args.shards, args.shapes, not args.no_split
+        )
+        for shard in manifest["shards"]:
+            print(
+                f"  {shard['id']}: {len(shard['units'])} units, {shard['triples']} triples"
+            )
+        print(f"✅ Manifest saved to {Path(args.work_dir) / MANIFEST_NAME}")
+
+    elif args.command == "work":
+        if args.processes > 1:
+            with Pool(args.processes) as pool:
+                done = sum(pool.map(_work_process, [(args.work_dir, args.shard)] * args.processes))
+        else:
+            done = run_worker(args.work_dir, args.shard)
+        print(f"📦 Validated {done} shard(s)")
+
+    elif args.command == "merge":
+        manifest = load_manifest(args.work_dir)
+        failed = retry_shards(args.work_dir, manifest, args.retries, args.lock_timeout)
+        if failed:
+            print(f"❌ No result for shard(s): {', '.join(failed)}")
+            raise SystemExit(1)
+        merged = merge_results(args.work_dir, manifest)
+        coverage = coverage_summary(merged, manifest["shapes"])
+        print(f"\n📦 Merged {merged['shards']} shards ({merged['triples']} triples)")
+        print(f"Conforms: {merged['conforms']}")
+        print(f"Validation results: {len(merged['results'])}")
+        print_report(coverage, "Entity")
+        if args.csv:
+            export_to_csv(merged["counts"], args.csv)
+        if args.json:
+            export_report(merged, coverage, args.json)
+
+
+if __name__ == "__main__":
+    main()
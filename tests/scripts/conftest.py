@@ -0,0 +1,8 @@
+import sys
+
+from tests import PROJECT_FOLDER
+
+# The scripts import each other as top-level modules
+SCRIPTS_FOLDER = PROJECT_FOLDER / "scripts"
+if str(SCRIPTS_FOLDER) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_FOLDER))
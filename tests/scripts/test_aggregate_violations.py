@@ -0,0 +1,107 @@
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from rdflib import Graph, URIRef
+
+from aggregate_violations import (
+    aggregate_files,
+    export_to_json,
+    find_publisher,
+    load_aggregate_json,
+    merge_aggregates,
+    prefixed_counts,
+)
+from shacl_index import load_index, namespace_graph
+from tests import FULL_SHAPES_FILE
+
+DATASET_WITHOUT_TITLE = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix ex: <{namespace}> .
+
+ex:dataset a dcat:Dataset ;
+    dct:description "A dataset" ;
+    dct:identifier "1" ;
+    dct:publisher ex:agent .
+"""
+
+
+SHARED_LICENCE = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix : <http://example.org/> .
+
+{first} a dcat:Dataset ; dct:license :licence ; dct:publisher {first}-publisher .
+{second} a dcat:Dataset ; dct:license :licence ; dct:publisher {second}-publisher .
+:licence a dct:LicenseDocument .
+"""
+
+
+@pytest.fixture(scope="module")
+def shapes() -> tuple[Graph, object]:
+    shacl_graph = Graph().parse(FULL_SHAPES_FILE)
+    return shacl_graph, load_index(FULL_SHAPES_FILE, shacl_graph)
+
+
+def write_dataset(folder: Path, name: str, namespace: str) -> Path:
+    file = folder / f"{name}.ttl"
+    file.write_text(DATASET_WITHOUT_TITLE.format(namespace=namespace))
+    return file
+
+
+def test_keys_are_full_iris_whatever_the_file_prefixes(tmp_path, shapes):
+    a = write_dataset(tmp_path, "a", "http://a.example/")
+    b = write_dataset(tmp_path, "b", "http://b.example/")
+
+    counts = aggregate_files([a, b], *shapes)
+
+    publishers = {key[3] for key in counts}
+    assert publishers == {"http://a.example/agent", "http://b.example/agent"}
+    assert all(key[0].startswith("http") for key in counts)
+
+
+def test_merge_keeps_publishers_of_different_runs_apart(tmp_path, shapes):
+    run_a = aggregate_files([write_dataset(tmp_path, "a", "http://a.example/")], *shapes)
+    run_b = aggregate_files([write_dataset(tmp_path, "b", "http://b.example/")], *shapes)
+    export_to_json(run_a, tmp_path / "a.json")
+    export_to_json(run_b, tmp_path / "b.json")
+
+    merged = merge_aggregates(
+        load_aggregate_json(tmp_path / "a.json"), load_aggregate_json(tmp_path / "b.json")
+    )
+
+    assert merged == run_a + run_b
+    assert len(merged) == len(run_a) + len(run_b)
+
+
+def test_prefixes_are_only_applied_for_display(shapes):
+    counts = Counter(
+        {
+            (
+                "http://data.europa.eu/r5r#dcat_Dataset_Shape",
+                "http://www.w3.org/ns/shacl#MinCountConstraintComponent",
+                "http://purl.org/dc/terms/title",
+                "Anonymous: publisher",
+            ): 2
+        }
+    )
+
+    shown = prefixed_counts(counts, namespace_graph(shapes[1]))
+
+    ((shape, component, path, publisher),) = shown
+    assert component == "sh:MinCountConstraintComponent"
+    assert path == "dct:title"
+    assert publisher == "Anonymous: publisher"
+    assert shown[(shape, component, path, publisher)] == 2
+
+
+@pytest.mark.parametrize("first, second", [(":a", ":b"), (":b", ":a")])
+def test_shared_node_publisher_does_not_depend_on_triple_order(first, second):
+    data_graph = Graph().parse(
+        data=SHARED_LICENCE.format(first=first, second=second), format="turtle"
+    )
+
+    publisher = find_publisher(data_graph, URIRef("http://example.org/licence"))
+
+    assert publisher == URIRef("http://example.org/a-publisher")
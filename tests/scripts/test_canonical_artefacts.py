@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from canonical_artefacts import (
+    BINARY_SUFFIX,
+    MANIFEST_FILE,
+    canonical_graph,
+    canonical_hash,
+    check_artefacts,
+    decode_binary,
+    encode_binary,
+    export_artefacts,
+    find_artefacts,
+    verify_export,
+)
+from tests import FULL_SHAPES_FILE
+
+ONTOLOGY = """
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix : <http://example.org/> .
+
+:Thing a owl:Class ;
+    rdfs:label "Thing"@en, "Ding"@de ;
+    rdfs:comment "Café ☕" ;
+    :weight "1.5"^^xsd:decimal ;
+    rdfs:subClassOf [ a owl:Restriction ; owl:onProperty :part ;
+                      owl:someValuesFrom [ a owl:Class ; rdfs:label "{label}" ] ] .
+"""
+
+
+def ontology(label="Part"):
+    return ONTOLOGY.replace("{label}", label)
+
+
+@pytest.fixture
+def exported(tmp_path):
+    root = tmp_path / "artefacts"
+    (root / "owl").mkdir(parents=True)
+    graph = Graph().parse(data=ontology(), format="turtle")
+    graph.serialize(root / "owl" / "thing.ttl", format="turtle")
+    graph.serialize(root / "owl" / "thing.rdf", format="xml")
+    output_dir = tmp_path / "canonical"
+    export_artefacts(find_artefacts(root), output_dir)
+    return root, output_dir
+
+
+@pytest.mark.parametrize(
+    "graph",
+    [
+        Graph().parse(data=ontology(), format="turtle"),
+        Graph().parse(FULL_SHAPES_FILE),
+    ],
+    ids=["blank-nodes-and-literals", "shapes"],
+)
+def test_binary_round_trip(graph):
+    canonical = canonical_graph(graph)
+
+    decoded = decode_binary(encode_binary(canonical, canonical_hash(graph)))
+
+    assert set(decoded) == set(canonical)
+    assert isomorphic(decoded, graph)
+
+
+def test_canonical_hash_ignores_blank_node_labels():
+    first = Graph().parse(data=ontology(), format="turtle")
+    second = Graph().parse(data=ontology(), format="turtle")
+
+    assert set(first) != set(second)
+    assert canonical_hash(first) == canonical_hash(second)
+    changed = Graph().parse(data=ontology("Other part"), format="turtle")
+    assert canonical_hash(changed) != canonical_hash(first)
+
+
+def test_export_verifies(exported):
+    root, output_dir = exported
+    results = check_artefacts(find_artefacts(root))
+
+    assert results["owl/thing"]["consistent"]
+    assert verify_export(output_dir, results)
+
+
+def test_verify_detects_stale_export(exported):
+    root, output_dir = exported
+    graph = Graph().parse(data=ontology("Other part"), format="turtle")
+    graph.serialize(root / "owl" / "thing.ttl", format="turtle")
+    graph.serialize(root / "owl" / "thing.rdf", format="xml")
+
+    assert not verify_export(output_dir, check_artefacts(find_artefacts(root)))
+
+
+def test_verify_detects_corrupted_ntriples(exported):
+    _, output_dir = exported
+    nt_file = output_dir / "owl" / "thing.nt"
+    nt_file.write_bytes(nt_file.read_bytes().replace(b"Thing", b"Thang"))
+
+    assert not verify_export(output_dir)
+
+
+@pytest.mark.parametrize("offset", [10, 60, -40, -1])
+def test_verify_detects_corrupted_binary(exported, offset):
+    _, output_dir = exported
+    binary_file = output_dir / "owl" / f"thing{BINARY_SUFFIX}"
+    data = bytearray(binary_file.read_bytes())
+    data[offset] ^= 0xFF
+    binary_file.write_bytes(bytes(data))
+
+    assert not verify_export(output_dir)
+
+
+def test_verify_detects_truncated_binary(exported):
+    _, output_dir = exported
+    binary_file = output_dir / "owl" / f"thing{BINARY_SUFFIX}"
+    binary_file.write_bytes(binary_file.read_bytes()[:-10])
+
+    assert not verify_export(output_dir)
+
+
+def test_verify_detects_a_wrong_triple_count(exported):
+    _, output_dir = exported
+    manifest_file = output_dir / MANIFEST_FILE
+    manifest = json.loads(manifest_file.read_text())
+    manifest["owl/thing"]["triples"] += 1
+    manifest_file.write_text(json.dumps(manifest))
+
+    assert not verify_export(output_dir)
@@ -0,0 +1,89 @@
+import pytest
+from rdflib import Graph
+
+from check_entity_coverage import compare_lists, entity_lines
+from compare_catalogues import (
+    QUALIFIERS,
+    UML_ENTITIES_FILE,
+    catalogue_names,
+    compare_catalogues,
+    shacl_baseline,
+)
+from extract_entity_usage import (
+    get_all_classes,
+    get_all_properties,
+    get_shacl_classes,
+    get_shacl_properties,
+    load_filter_entities,
+    load_graph_from_path,
+)
+from tests import FULL_SHAPES_FILE, PROJECT_FOLDER, TEST_DATA_FOLDER
+
+CATALOGUES = sorted(
+    path for path in (TEST_DATA_FOLDER / "shacl").iterdir() if path.is_dir()
+)
+UML_FILE = PROJECT_FOLDER / UML_ENTITIES_FILE
+
+
+@pytest.fixture(scope="module")
+def filters():
+    return {
+        label: load_filter_entities(UML_FILE, "qualifier", qualifier)
+        for label, qualifier in QUALIFIERS.items()
+    }
+
+
+def pipeline_coverage(shapes_graph, folder, filters):
+    """
+    What make coverage-report-by-data computes for a folder: the filtered
+    SHACL and data extractions compared by check_entity_coverage.py
+    """
+    graph = load_graph_from_path(folder)
+    coverage = {}
+    for label, (entities, parents) in filters.items():
+        shacl_lines = entity_lines(
+            get_shacl_classes(shapes_graph, True, entities),
+            get_shacl_properties(shapes_graph, True, entities, parents),
+        )
+        data_lines = entity_lines(
+            get_all_classes(graph, True, entities),
+            get_all_properties(graph, True, entities, parents),
+        )
+        coverage[label] = compare_lists(shacl_lines, data_lines)
+    return coverage
+
+
+def test_coverage_matches_the_per_folder_pipeline(filters):
+    shapes_graph = Graph().parse(FULL_SHAPES_FILE)
+    baseline = shacl_baseline(FULL_SHAPES_FILE, UML_FILE)
+
+    rows = compare_catalogues(CATALOGUES, baseline, processes=2)
+
+    assert [row["publisher"] for row in rows] == [path.name for path in CATALOGUES]
+    for row, folder in zip(rows, CATALOGUES):
+        expected = pipeline_coverage(shapes_graph, folder, filters)
+        assert row["error"] is None
+        for label, comparison in expected.items():
+            assert baseline[label] == comparison["defined"]
+            assert row["coverage"][label] == comparison["coverage_percent"], folder.name
+            assert row["used"][label] == set(comparison["used"]), folder.name
+
+
+def test_catalogue_names_keep_dotted_folder_names(tmp_path):
+    paths = []
+    for name in ("data.public.lu", "data.public.de", "data.public.lu/x"):
+        path = tmp_path / "harvest" / name
+        path.mkdir(parents=True)
+        paths.append(path)
+    file = tmp_path / "catalogue.ttl"
+    file.touch()
+
+    names = catalogue_names(paths + [file, file])
+
+    assert names == [
+        "data.public.lu",
+        "data.public.de",
+        "x",
+        "catalogue",
+        "catalogue-2",
+    ]
@@ -0,0 +1,133 @@
+import multiprocessing
+import sys
+
+import pytest
+
+from extract_entity_usage import (
+    cached_file_usage,
+    filter_usage,
+    get_all_classes,
+    get_all_properties,
+    load_graph_from_path,
+    load_usage_from_path,
+    main,
+)
+from pipeline_metrics import metrics
+from tests import PROJECT_FOLDER, TEST_DATA_FOLDER
+
+UML_ENTITIES_FILE = PROJECT_FOLDER / "reports" / "uml_entities.csv"
+
+PREFIXES = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix : <http://example.org/> .
+"""
+
+
+def graph_usage(path, use_prefixes):
+    graph = load_graph_from_path(path)
+    return (
+        get_all_classes(graph, use_prefixes=use_prefixes),
+        get_all_properties(graph, use_prefixes=use_prefixes),
+    )
+
+
+def cached_usage(path, cache_dir, use_prefixes):
+    return filter_usage(load_usage_from_path(path, cache_dir, use_prefixes=use_prefixes))
+
+
+def test_cache_joins_subjects_across_files(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.ttl").write_text(PREFIXES + ":ds a dcat:Dataset .\n")
+    (data / "b.ttl").write_text(PREFIXES + ':ds dct:title "x" .\n_:d dct:title "y" .\n')
+
+    classes, properties = cached_usage(data, tmp_path / "cache", use_prefixes=True)
+
+    assert classes == ["dcat:Dataset"]
+    assert properties == [("dct:title", None), ("dct:title", "dcat:Dataset")]
+    assert (classes, properties) == graph_usage(data, use_prefixes=True)
+
+
+@pytest.mark.parametrize("use_prefixes", [False, True])
+def test_cache_does_not_change_the_output(tmp_path, use_prefixes):
+    path = TEST_DATA_FOLDER / "shacl"
+    expected = graph_usage(path, use_prefixes)
+
+    cold = cached_usage(path, tmp_path, use_prefixes)
+    warm = cached_usage(path, tmp_path, use_prefixes)
+
+    assert cold == expected
+    assert warm == expected
+
+
+_BARRIER = None
+
+
+def _start_together(barrier):
+    global _BARRIER
+    _BARRIER = barrier
+
+
+def _cache_at_once(task):
+    file_path, cache_dir = task
+    _BARRIER.wait(timeout=30)
+    return cached_file_usage(file_path, cache_dir)[0]["classes"]
+
+
+def test_processes_can_cache_the_same_file_at_once(tmp_path):
+    file_path = tmp_path / "catalogue.ttl"
+    file_path.write_text(
+        PREFIXES
+        + "".join(f':ds{i} a dcat:Dataset ; dct:title "{i}" .\n' for i in range(2000))
+    )
+    cache_dir = tmp_path / "cache"
+    processes = 8
+    barrier = multiprocessing.Barrier(processes)
+
+    with multiprocessing.Pool(processes, _start_together, (barrier,)) as pool:
+        results = pool.map(
+            _cache_at_once, [(file_path, cache_dir)] * processes, chunksize=1
+        )
+
+    assert all(classes == results[0] for classes in results)
+    assert not list(cache_dir.rglob("*.tmp"))
+
+
+def test_cache_does_not_change_the_json(tmp_path, monkeypatch):
+    outputs = []
+    for extra in ([], ["--cache", str(tmp_path / "cache")]):
+        output = tmp_path / f"usage-{len(outputs)}.json"
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "extract_entity_usage.py",
+                str(TEST_DATA_FOLDER / "shacl"),
+                "--prefixed",
+                "--filter-csv",
+                str(UML_ENTITIES_FILE),
+                "--filter-column",
+                "qualifier",
+                "--filter-value",
+                "mandatory",
+                "--json",
+                str(output),
+            ]
+            + extra,
+        )
+        main()
+        outputs.append(output.read_text())
+
+    assert outputs[0] == outputs[1]
+
+
+def test_stages_are_timed_in_one_pass():
+    graph = load_graph_from_path(TEST_DATA_FOLDER / "shacl" / "dcat-ap-full-dummy")
+    metrics.reset("test")
+
+    properties = get_all_properties(graph, use_prefixes=True)
+
+    assert set(metrics.spans) == {"query", "qnames", "filter"}
+    assert all(calls == 1 for _, calls in metrics.spans.values())
+    assert metrics.counters["query_rows"] >= len(properties) > 0
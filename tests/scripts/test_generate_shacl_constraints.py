@@ -0,0 +1,58 @@
+import pytest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from generate_shacl_constraints import (
+    NAMESPACES_FILE,
+    XMI_FILE,
+    compare_constraints,
+    extract_entities,
+    generate_constraints,
+    load_namespaces,
+    parse_cardinality,
+)
+from tests import FULL_SHAPES_FILE, PROJECT_FOLDER
+
+MODEL_FILE = PROJECT_FOLDER / XMI_FILE
+
+
+def generate(xmi_file) -> Graph:
+    classes, entities = extract_entities(xmi_file)
+    return generate_constraints(
+        classes, entities, load_namespaces(PROJECT_FOLDER / NAMESPACES_FILE)
+    )
+
+
+@pytest.mark.parametrize(
+    "cardinality, expected",
+    [
+        ("0..1", (0, 1)),
+        ("1..n", (1, None)),
+        ("0..*", (0, None)),
+        ("1", (1, 1)),
+        ("n", (0, None)),
+        ("*", (0, None)),
+    ],
+)
+def test_parse_cardinality(cardinality, expected):
+    assert parse_cardinality(cardinality) == expected
+
+
+def test_committed_shapes_match_the_model():
+    missing, unexpected = compare_constraints(
+        generate(MODEL_FILE), Graph().parse(FULL_SHAPES_FILE)
+    )
+
+    assert not missing
+    assert not unexpected
+
+
+def test_bare_star_multiplicity_means_zero_or_more(tmp_path):
+    xmi = MODEL_FILE.read_text(encoding="utf-8")
+    assert 'multiplicity="0..*"' in xmi
+    shorthand = tmp_path / "model.xml"
+    shorthand.write_text(
+        xmi.replace('multiplicity="0..*"', 'multiplicity="*"', 1), encoding="utf-8"
+    )
+
+    assert isomorphic(generate(shorthand), generate(MODEL_FILE))
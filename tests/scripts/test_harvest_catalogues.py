@@ -0,0 +1,285 @@
+import asyncio
+import json
+
+import pytest
+from rdflib import Graph
+
+import harvest_catalogues
+from aggregate_violations import iter_validation_results
+from harvest_catalogues import STATE_FILE, ConnectionPool, harvest
+from shacl_index import load_index, validate_dispatched
+from tests import FULL_SHAPES_FILE, TEST_DATA_FOLDER
+
+BODY = b"<http://example.org/s> <http://example.org/p> <http://example.org/o> .\n"
+
+
+def response_head(length):
+    return b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % length
+
+
+async def serve(handler, requests, handlers):
+    async def handle(reader, writer):
+        handlers.append(asyncio.current_task())
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                requests.append(writer)
+                if not await handler(len(requests), writer):
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def fetch(handler, timeout=5, times=1):
+    """GET the local server times in a row, returning the body of the last"""
+
+    async def run():
+        requests, handlers = [], []
+        server = await serve(handler, requests, handlers)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/catalogue.nt"
+        pool = ConnectionPool(timeout=timeout)
+        try:
+            for _ in range(times):
+                body = bytearray()
+                await pool.get(url, {}, body.extend, body.clear)
+        finally:
+            pool.close()
+            server.close()
+            await asyncio.gather(*handlers)
+        return bytes(body), len({id(writer) for writer in requests})
+
+    return asyncio.run(run())
+
+
+def test_retry_discards_the_partial_body():
+    async def handler(request, writer):
+        if request == 2:
+            # The kept-alive connection breaks in the middle of the body
+            writer.write(response_head(len(BODY)) + BODY[:10])
+            await writer.drain()
+            return False
+        writer.write(response_head(len(BODY)) + BODY)
+        await writer.drain()
+        return True
+
+    body, connections = fetch(handler, times=2)
+
+    assert body == BODY
+    assert connections == 2
+
+
+def test_timeout_applies_to_each_read():
+    async def handler(request, writer):
+        writer.write(response_head(len(BODY)))
+        for i in range(0, len(BODY), 16):
+            await asyncio.sleep(0.05)
+            writer.write(BODY[i : i + 16])
+            await writer.drain()
+        return True
+
+    # The body takes longer than the timeout, but each read does not
+    body, _ = fetch(handler, timeout=0.2)
+
+    assert body == BODY
+
+
+TITLE_DATA = TEST_DATA_FOLDER / "shacl" / "dcat-Dataset-dct-title"
+CATALOGUES = {
+    "/etag.ttl": TITLE_DATA / "dcat-Dataset-dct-title_invalid.ttl",
+    "/dated.ttl": TITLE_DATA / "dcat-Dataset-dct-title_valid.ttl",
+    "/full.ttl": TITLE_DATA.parent / "dcat-ap-full-dummy" / "dcat-ap-full-dummy.ttl",
+}
+LAST_MODIFIED = "Mon, 05 Oct 2026 10:00:00 GMT"
+
+
+class Site:
+    """
+    Stand-in publisher site: /etag.ttl answers If-None-Match, /dated.ttl
+    answers If-Modified-Since, /moved redirects to /etag.ttl and /full.ttl
+    is always sent in full
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.handlers = []
+        self.port = None
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def respond(self, path, headers):
+        if path == "/moved":
+            return b"301 Moved Permanently", {"Location": "/etag.ttl"}, b""
+        if path == "/etag.ttl" and headers.get("if-none-match") == '"v1"':
+            return b"304 Not Modified", {}, b""
+        if path == "/dated.ttl" and headers.get("if-modified-since") == LAST_MODIFIED:
+            return b"304 Not Modified", {}, b""
+        response_headers = {"Content-Type": "text/turtle"}
+        if path == "/etag.ttl":
+            response_headers["ETag"] = '"v1"'
+        if path == "/dated.ttl":
+            response_headers["Last-Modified"] = LAST_MODIFIED
+        return b"200 OK", response_headers, CATALOGUES[path].read_bytes()
+
+    async def handle(self, reader, writer):
+        self.handlers.append(asyncio.current_task())
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                request_line, *lines = head.strip().split("\r\n")
+                path = request_line.split()[1]
+                headers = {}
+                for line in lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                self.requests.append((path, headers))
+
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(self.delay)
+                status, response_headers, body = self.respond(path, headers)
+                self.in_flight -= 1
+
+                response_headers["Content-Length"] = str(len(body))
+                head = "".join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()
+                )
+                writer.write(b"HTTP/1.1 %s\r\n%s\r\n" % (status, head.encode()) + body)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    def harvest(self, paths, output_dir, **kwargs):
+        async def run():
+            server = await asyncio.start_server(
+                self.handle, "127.0.0.1", self.port or 0
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            try:
+                return await harvest(
+                    [self.url(path) for path in paths],
+                    output_dir,
+                    FULL_SHAPES_FILE,
+                    kwargs.get("concurrency", 8),
+                    kwargs.get("per_host", 2),
+                    kwargs.get("workers", 1),
+                    5,
+                )
+            finally:
+                server.close()
+                await asyncio.gather(*self.handlers)
+
+        self.requests = []
+        self.handlers = []
+        return asyncio.run(run())
+
+
+def expected_validation(file_path):
+    shacl_graph = Graph().parse(FULL_SHAPES_FILE)
+    data_graph = Graph().parse(file_path)
+    conforms, report_graph, _ = validate_dispatched(
+        data_graph, shacl_graph, load_index(FULL_SHAPES_FILE, shacl_graph)
+    )
+    return {
+        "conforms": conforms,
+        "violations": sum(1 for _ in iter_validation_results(report_graph)),
+        "triples": len(data_graph),
+    }
+
+
+PATHS = ["/etag.ttl", "/dated.ttl", "/moved", "/full.ttl"]
+
+
+@pytest.fixture(scope="module")
+def harvested(tmp_path_factory):
+    """The same site harvested twice, validating only on the first run"""
+    output_dir = tmp_path_factory.mktemp("harvest")
+    site = Site()
+    first = site.harvest(PATHS, output_dir, workers=1)
+    first_requests = site.requests
+    second = site.harvest(PATHS, output_dir, workers=0)
+    return site, output_dir, first, first_requests, second, site.requests
+
+
+def test_harvest_downloads_and_validates(harvested):
+    site, output_dir, first, _, _, _ = harvested
+    by_path = dict(zip(PATHS, first))
+
+    assert [result["status"] for result in first] == ["downloaded"] * len(PATHS)
+    for path, result in by_path.items():
+        source = CATALOGUES["/etag.ttl" if path == "/moved" else path]
+        assert open(result["path"], "rb").read() == source.read_bytes()
+        assert result["path"].endswith(".ttl")
+        validation = {f: result[f] for f in ("conforms", "violations", "triples")}
+        assert validation == expected_validation(source)
+
+
+def test_harvest_follows_redirects(harvested):
+    _, _, first, first_requests, _, _ = harvested
+
+    assert first[PATHS.index("/moved")]["url"].endswith("/moved")
+    assert [path for path, _ in first_requests].count("/etag.ttl") == 2
+
+
+def test_harvest_sends_conditional_requests(harvested):
+    _, output_dir, _, first_requests, _, second_requests = harvested
+    with open(output_dir / STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+
+    assert not any("if-none-match" in headers for _, headers in first_requests)
+    conditional = {
+        path: (headers.get("if-none-match"), headers.get("if-modified-since"))
+        for path, headers in second_requests
+    }
+    assert conditional["/etag.ttl"] == ('"v1"', None)
+    assert conditional["/moved"] == ('"v1"', None)
+    assert conditional["/dated.ttl"] == (None, LAST_MODIFIED)
+    assert conditional["/full.ttl"] == (None, None)
+    assert sorted(state) == sorted(result["url"] for result in harvested[2])
+
+
+def test_harvest_reuses_the_validation_of_unchanged_documents(harvested):
+    _, _, first, _, second, _ = harvested
+    fields = ("path", "conforms", "violations", "triples")
+
+    assert [result["status"] for result in second] == [
+        "not_modified",
+        "not_modified",
+        "not_modified",
+        "downloaded",
+    ]
+    for before, after in zip(first[:3], second[:3]):
+        assert {f: after[f] for f in fields} == {f: before[f] for f in fields}
+    # Changed documents are not validated without workers
+    assert "conforms" not in second[3]
+
+
+def test_harvest_limits_requests_per_host(harvested):
+    site = harvested[0]
+
+    assert site.max_in_flight == 2
+
+
+def test_harvest_saves_the_state_as_results_come_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(harvest_catalogues, "STATE_SAVE_INTERVAL", 0)
+    site = Site()
+    seen = []
+
+    respond = site.respond
+
+    def record_state(path, headers):
+        state_file = tmp_path / STATE_FILE
+        seen.append(json.loads(state_file.read_text()) if state_file.exists() else {})
+        return respond(path, headers)
+
+    site.respond = record_state
+    site.harvest(["/etag.ttl", "/dated.ttl"], tmp_path, concurrency=1, workers=0)
+
+    assert seen[0] == {}
+    assert seen[1][site.url("/etag.ttl")]["etag"] == '"v1"'
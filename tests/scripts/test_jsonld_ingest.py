@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import pytest
+from rdflib import Dataset, Graph
+from rdflib.compare import isomorphic
+
+from jsonld_ingest import clear_context_cache, is_streamable, parse_jsonld
+from tests import TEST_DATA_FOLDER
+
+CONTEXT = {
+    "dcat": "http://www.w3.org/ns/dcat#",
+    "dct": "http://purl.org/dc/terms/",
+    "Dataset": "dcat:Dataset",
+    "title": "dct:title",
+    "publisher": {"@id": "dct:publisher", "@type": "@id"},
+}
+
+ITEMS = [
+    {"@id": "http://ex/a", "@type": "Dataset", "title": "x", "publisher": "http://ex/org"},
+    {"@id": "http://ex/b", "@type": "Dataset", "title": {"@value": "y", "@language": "en"}},
+]
+
+# The same document with its keys in different orders
+DOCUMENTS = {
+    "context first": {"@context": CONTEXT, "@graph": ITEMS},
+    "context last": {"@graph": ITEMS, "@context": CONTEXT},
+    "context between": {"@id": "http://ex/doc", "@graph": ITEMS, "@context": CONTEXT},
+    "array": [{"@context": CONTEXT, **item} for item in ITEMS],
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_context_cache():
+    clear_context_cache()
+    yield
+    clear_context_cache()
+
+
+def write(folder: Path, document) -> Path:
+    file = folder / "doc.jsonld"
+    file.write_text(json.dumps(document))
+    return file
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+def test_same_quads_as_rdflib(tmp_path, name):
+    file = write(tmp_path, DOCUMENTS[name])
+
+    expected = set(Dataset().parse(file, format="json-ld").quads())
+    streamed = set(parse_jsonld(file, Dataset()).quads())
+
+    assert len(expected) == 5
+    assert streamed == expected
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 512])
+def test_batches_do_not_change_the_result(tmp_path, batch_size):
+    file = write(tmp_path, DOCUMENTS["context first"])
+
+    assert isomorphic(
+        parse_jsonld(file, batch_size=batch_size), Graph().parse(file, format="json-ld")
+    )
+
+
+@pytest.mark.parametrize("name", ["context last", "context between"])
+def test_late_context_is_not_streamed(tmp_path, name):
+    with open(write(tmp_path, DOCUMENTS[name]), encoding="utf-8") as f:
+        assert not is_streamable(f)
+
+
+def test_external_context_like_rdflib(tmp_path):
+    with open(TEST_DATA_FOLDER / "context.jsonld", encoding="utf-8") as f:
+        context = json.load(f)["@context"]
+    file = write(
+        tmp_path,
+        {"@graph": [{"@id": "ex:a", "@type": "dcat:Dataset", "dcterms:title": "x"}]},
+    )
+
+    expected = Graph().parse(file, format="json-ld", context=context)
+    streamed = parse_jsonld(file, context=context)
+
+    assert len(streamed) == len(expected) == 2
+    assert isomorphic(streamed, expected)
+
+
+def test_context_file_gives_no_triples(tmp_path):
+    file = TEST_DATA_FOLDER / "context.jsonld"
+
+    assert isomorphic(parse_jsonld(file), Graph().parse(file, format="json-ld"))
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+from rdflib import Graph
+
+import ntriples_scan
+from extract_entity_usage import (
+    filter_usage,
+    get_all_classes,
+    get_all_properties,
+    load_graph_from_path,
+    scan_usage,
+    scannable_files,
+)
+from ntriples_scan import split_ranges
+from tests import TEST_DATA_FOLDER
+
+# rdflib numbers the prefixes it generates in the order it meets the names
+GENERATED_PREFIX = re.compile(r"^ns\d+:")
+
+
+@pytest.fixture(scope="module")
+def ntriples_folder(tmp_path_factory):
+    """The shacl test data as one N-Triples file per Turtle file"""
+    folder = tmp_path_factory.mktemp("nt")
+    for file in sorted((TEST_DATA_FOLDER / "shacl").rglob("*.ttl")):
+        graph = Graph().parse(file, format="turtle")
+        graph.serialize(folder / f"{file.stem}.nt", format="nt", encoding="utf-8")
+    return folder
+
+
+def unnumbered(name):
+    return GENERATED_PREFIX.sub("ns:", name) if name else name
+
+
+def comparable(usage):
+    classes, properties = usage
+    return (
+        sorted(unnumbered(cls) for cls in classes),
+        sorted(
+            ((unnumbered(prop), unnumbered(parent)) for prop, parent in properties),
+            key=lambda r: (r[0], r[1] or ""),
+        ),
+    )
+
+
+def graph_usage(path, use_prefixes):
+    graph = load_graph_from_path(path)
+    return comparable(
+        (
+            get_all_classes(graph, use_prefixes=use_prefixes),
+            get_all_properties(graph, use_prefixes=use_prefixes),
+        )
+    )
+
+
+@pytest.mark.parametrize("use_prefixes", [False, True])
+def test_scan_matches_graph(ntriples_folder, use_prefixes):
+    files = scannable_files(ntriples_folder)
+
+    usage = scan_usage(files, use_prefixes=use_prefixes)
+
+    assert comparable(filter_usage(usage)) == graph_usage(ntriples_folder, use_prefixes)
+
+
+def test_scan_in_byte_ranges_matches_graph(ntriples_folder, monkeypatch):
+    monkeypatch.setattr(ntriples_scan, "MIN_RANGE_SIZE", 256)
+    files = scannable_files(ntriples_folder)
+    assert any(len(split_ranges(file, 4)) > 1 for file in files)
+
+    usage = scan_usage(files, use_prefixes=True, processes=4)
+
+    assert comparable(filter_usage(usage)) == graph_usage(ntriples_folder, use_prefixes=True)
+
+
+def test_split_ranges_end_on_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(ntriples_scan, "MIN_RANGE_SIZE", 1)
+    file = tmp_path / "lines.nt"
+    data = b"".join(b"<s%d> <p> <o> .\n" % i for i in range(50))
+    file.write_bytes(data)
+
+    ranges = split_ranges(file, 7)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(data[end - 1 : end] == b"\n" for _, end in ranges)
+
+
+def test_scan_reads_terms_followed_by_the_dot(tmp_path):
+    rdf_type = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+    file = tmp_path / "compact.nt"
+    file.write_text(
+        f"<http://e/s> {rdf_type} <http://e/C>.\n"
+        '<http://e/s> <http://e/title> "s".\n'
+        f"<http://e/t> {rdf_type} <http://e/D>.\n"
+        "<http://e/t> <http://e/ref> _:b.\n"
+        f"_:b {rdf_type} <http://e/E>.\n"
+        '_:b <http://e/title> "b"@en.\n'
+        "# a comment\n"
+    )
+
+    usage = scan_usage([file])
+
+    assert usage["classes"] == {"http://e/C", "http://e/D", "http://e/E"}
+    assert filter_usage(usage) == graph_usage(file, use_prefixes=False)
+
+
+def test_turtle_is_not_scanned():
+    assert scannable_files(TEST_DATA_FOLDER / "shacl") is None
@@ -0,0 +1,123 @@
+import json
+from collections import Counter
+
+import pytest
+from pyshacl import validate
+from rdflib import BNode, Graph, URIRef
+
+from aggregate_violations import iter_validation_results
+from shacl_index import (
+    compile_index,
+    file_hash,
+    freeze_index,
+    index_path,
+    load_index,
+    validate_dispatched,
+)
+from tests import FULL_SHAPES_FILE, TEST_DATA_FOLDER
+
+DATA_FILES = sorted((TEST_DATA_FOLDER / "shacl").rglob("*.ttl"))
+
+SHAPES = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix : <http://example.org/> .
+
+:DatasetShape a sh:NodeShape ;
+    sh:targetClass dcat:Dataset ;
+    sh:property [ sh:path dct:title ; sh:minCount 1 ] .
+"""
+
+
+@pytest.fixture(scope="module")
+def full_index(full_shacl_shapes):
+    return load_index(FULL_SHAPES_FILE, full_shacl_shapes)
+
+
+def results(report_graph):
+    return Counter(
+        tuple(None if isinstance(term, BNode) else term for term in result)
+        for result in iter_validation_results(report_graph)
+    )
+
+
+def test_saved_index_is_up_to_date():
+    with open(index_path(FULL_SHAPES_FILE), "r", encoding="utf-8") as f:
+        assert json.load(f)["sha256"] == file_hash(FULL_SHAPES_FILE)
+
+
+@pytest.mark.parametrize("data_file", DATA_FILES, ids=lambda file: file.stem)
+def test_dispatched_validation_matches_full(data_file, full_shacl_shapes, full_index):
+    data_graph = Graph().parse(data_file)
+
+    conforms, report_graph, _ = validate(data_graph, shacl_graph=full_shacl_shapes)
+    dispatched = validate_dispatched(data_graph, full_shacl_shapes, full_index)
+
+    assert dispatched[0] == conforms
+    assert results(dispatched[1]) == results(report_graph)
+
+
+def test_load_index_does_not_write(tmp_path):
+    shapes_file = tmp_path / "shapes.ttl"
+    shapes_file.write_text(SHAPES)
+
+    index = load_index(shapes_file)
+
+    assert not index_path(shapes_file).exists()
+    assert list(tmp_path.iterdir()) == [shapes_file]
+    assert "http://www.w3.org/ns/dcat#Dataset" in index.classes
+    assert index.dispatchable
+
+
+# A Catalog, whose shapes are dispatched, and a Dataset typed only by RDFS
+# inference from the ontology graph
+INFERRED_DATASET = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix : <http://example.org/> .
+
+:catalog a dcat:Catalog ; dct:title "Catalogue" ; dcat:dataset :ds .
+:ds a :SpecialDataset .
+"""
+ONTOLOGY = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix : <http://example.org/> .
+
+:SpecialDataset rdfs:subClassOf dcat:Dataset .
+"""
+
+
+def test_inference_runs_every_shape(full_shacl_shapes, full_index):
+    data_graph = Graph().parse(data=INFERRED_DATASET, format="turtle")
+    ont_graph = Graph().parse(data=ONTOLOGY, format="turtle")
+    options = {"ont_graph": ont_graph, "inference": "rdfs"}
+
+    _, report_graph, _ = validate(data_graph, shacl_graph=full_shacl_shapes, **options)
+    dispatched = validate_dispatched(data_graph, full_shacl_shapes, full_index, **options)
+
+    focus_nodes = {result[3] for result in results(report_graph)}
+    assert URIRef("http://example.org/ds") in focus_nodes
+    assert results(dispatched[1]) == results(report_graph)
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        ":TitleShape a sh:PropertyShape ; sh:targetClass dcat:Dataset ; "
+        "sh:path dct:title ; sh:maxCount 1 .",
+        "[] sh:targetClass dcat:Dataset ; sh:property [ sh:path dct:title ] .",
+        ":NodeShape a sh:NodeShape ; sh:targetNode :ds ; sh:closed true .",
+        ":TitleShape a sh:PropertyShape ; sh:targetSubjectsOf dct:title ; "
+        "sh:path dct:title ; sh:minLength 1 .",
+        ":Agent a sh:NodeShape, rdfs:Class ; "
+        "sh:property [ sh:path dct:title ; sh:minCount 1 ] .",
+    ],
+    ids=["property-shape", "untyped", "target-node", "subjects-of", "implicit-class"],
+)
+def test_shapes_the_index_does_not_cover_are_not_dispatched(extra):
+    shapes = SHAPES + "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n"
+    index = freeze_index(compile_index(Graph().parse(data=shapes + extra)))
+
+    assert not index.dispatchable
@@ -0,0 +1,175 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from validation_shards import (
+    claim_shard,
+    load_manifest,
+    lock_file,
+    merge_results,
+    plan_shards,
+    release_shard,
+    result_file,
+    retry_shards,
+    run_worker,
+)
+from tests import FULL_SHAPES_FILE, TEST_DATA_FOLDER
+
+# A publisher shared by the Catalog and a Dataset, and a Dataset that only
+# gets its publisher through the Catalog
+SHARED_PUBLISHER = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix foaf: <http://xmlns.com/foaf/0.1/> .
+@prefix : <http://example.org/> .
+
+:catalog a dcat:Catalog ;
+    dct:title "Catalogue" ;
+    dct:description "A catalogue" ;
+    dct:publisher :org ;
+    dcat:dataset :ds1, :ds2 .
+
+:org a foaf:Agent ;
+    foaf:name "Org" .
+
+:ds1 a dcat:Dataset ;
+    dct:description "First" ;
+    dct:identifier "1" .
+
+:ds2 a dcat:Dataset ;
+    dct:description "Second" ;
+    dct:identifier "2" ;
+    dct:publisher :org .
+"""
+
+# A Distribution without dcat:accessURL shared by Datasets of two publishers
+SHARED_DISTRIBUTION = """
+@prefix dcat: <http://www.w3.org/ns/dcat#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix : <http://example.org/> .
+
+:catalog a dcat:Catalog ;
+    dct:title "Catalogue" ;
+    dct:description "A catalogue" ;
+    dct:publisher :pc ;
+    dcat:dataset :ds1, :ds2 .
+
+:ds1 a dcat:Dataset ;
+    dct:description "First" ;
+    dct:identifier "1" ;
+    dct:publisher :pa ;
+    dcat:distribution :dist .
+
+:ds2 a dcat:Dataset ;
+    dct:description "Second" ;
+    dct:identifier "2" ;
+    dct:publisher :pb ;
+    dcat:distribution :dist .
+
+:dist a dcat:Distribution .
+"""
+
+
+def validate(paths: list, work_dir: Path, shard_count: int) -> dict:
+    manifest = plan_shards(paths, work_dir, shard_count, FULL_SHAPES_FILE)
+    run_worker(work_dir)
+    return merge_results(work_dir, manifest)
+
+
+def write_catalogues(folder: Path, data: str) -> list:
+    files = []
+    for name in ("catalogue-1.ttl", "catalogue-2.ttl"):
+        file = folder / name
+        file.write_text(data)
+        files.append(file)
+    return files
+
+
+@pytest.fixture
+def shared_publisher(tmp_path) -> list:
+    return write_catalogues(tmp_path, SHARED_PUBLISHER)
+
+
+@pytest.mark.parametrize(
+    "data, focus_publishers",
+    [
+        (
+            SHARED_PUBLISHER,
+            {
+                ("http://example.org/ds1", "http://example.org/org"),
+                ("http://example.org/ds2", "http://example.org/org"),
+            },
+        ),
+        (
+            SHARED_DISTRIBUTION,
+            {
+                ("http://example.org/catalog", "http://example.org/pc"),
+                ("http://example.org/dist", "http://example.org/pa"),
+                ("http://example.org/ds1", "http://example.org/pa"),
+                ("http://example.org/ds2", "http://example.org/pb"),
+            },
+        ),
+    ],
+    ids=["shared-publisher", "shared-distribution"],
+)
+def test_split_report_matches_unsplit(tmp_path, data, focus_publishers):
+    paths = write_catalogues(tmp_path, data)
+
+    whole = validate(paths, tmp_path / "whole", 1)
+    split = validate(paths, tmp_path / "split", 4)
+
+    assert len(load_manifest(tmp_path / "split")["shards"]) > 2
+    assert split["results"] == whole["results"]
+    assert split["counts"] == whole["counts"]
+    assert split["classes"] == whole["classes"]
+    assert split["properties"] == whole["properties"]
+    assert {(row["focus"], row["publisher"]) for row in whole["results"]} == (
+        focus_publishers
+    )
+
+
+@pytest.mark.parametrize("folder", ["dcat-ap-full-dummy", "dcat-ap-lu_dummy"])
+def test_split_test_data_matches_unsplit(tmp_path, folder):
+    paths = [TEST_DATA_FOLDER / "shacl" / folder]
+
+    whole = validate(paths, tmp_path / "whole", 1)
+    split = validate(paths, tmp_path / "split", 8)
+
+    assert split["results"] == whole["results"]
+    assert split["classes"] == whole["classes"]
+    assert split["properties"] == whole["properties"]
+
+
+def test_merge_does_not_retry_a_shard_being_validated(tmp_path, shared_publisher):
+    manifest = plan_shards(shared_publisher, tmp_path, 1, FULL_SHAPES_FILE)
+    shard_id = manifest["shards"][0]["id"]
+    assert claim_shard(tmp_path, shard_id)
+
+    missing = retry_shards(tmp_path, manifest, retries=1)
+
+    assert missing == [shard_id]
+    assert lock_file(tmp_path, shard_id).exists()
+
+
+def test_merge_breaks_a_stale_lock(tmp_path, shared_publisher):
+    manifest = plan_shards(shared_publisher, tmp_path, 1, FULL_SHAPES_FILE)
+    shard_id = manifest["shards"][0]["id"]
+    lock = lock_file(tmp_path, shard_id)
+    lock.parent.mkdir(parents=True)
+    lock.write_text(f"other-node 1 {time.time() - 60}\n")
+
+    assert retry_shards(tmp_path, manifest, retries=1, lock_timeout=30) == []
+    assert result_file(tmp_path, shard_id).exists()
+    assert not lock.exists()
+
+
+def test_release_leaves_a_lock_taken_over(tmp_path):
+    lock = lock_file(tmp_path, "shard-0000")
+    lock.parent.mkdir(parents=True)
+    lock.write_text(f"other-node {os.getpid() + 1} {time.time()}\n")
+
+    release_shard(tmp_path, "shard-0000")
+
+    assert lock.exists()